@@ -1,22 +1,73 @@
+import numpy as np
 import matplotlib.pyplot as plt
 
-def dda_algorithm(x1, y1, x2, y2):
-    """Алгоритм ЦДА"""
+def _visible_steps(steps, coord_at, direction, lo, hi):
+    """
+    Диапазон шагов [first, last] из [0, steps], на котором монотонная
+    координата coord_at(k) лежит в [lo, hi]; direction - знак её изменения.
+    Границы ищутся двоичным поиском, т.е. за O(log steps) вычислений.
+    """
+    if direction < 0:
+        coord_at, lo, hi = (lambda k, f=coord_at: -f(k)), -hi, -lo
+
+    # Первый шаг, на котором координата не меньше lo
+    left, right = 0, steps + 1
+    while left < right:
+        mid = (left + right) // 2
+        if coord_at(mid) >= lo:
+            right = mid
+        else:
+            left = mid + 1
+    first = left
+
+    # Последний шаг, на котором координата не больше hi
+    left, right = -1, steps
+    while left < right:
+        mid = (left + right + 1) // 2
+        if coord_at(mid) <= hi:
+            left = mid
+        else:
+            right = mid - 1
+    return first, left
+
+def _clip_steps(steps, x_at, y_at, sx, sy, viewport):
+    """Диапазон шагов отрезка, пиксели которых попадают в окно (x_min, y_min, x_max, y_max)."""
+    x_min, y_min, x_max, y_max = viewport
+    x_first, x_last = _visible_steps(steps, x_at, sx, x_min, x_max)
+    y_first, y_last = _visible_steps(steps, y_at, sy, y_min, y_max)
+    return max(x_first, y_first), min(x_last, y_last)
+
+def dda_algorithm(x1, y1, x2, y2, viewport=None):
+    """
+    Алгоритм ЦДА.
+    - viewport: необязательное окно (x_min, y_min, x_max, y_max); если задано,
+      обходятся только видимые пиксели.
+    Координата k-го шага вычисляется как x1 + k * x_inc, а не накоплением
+    суммы, поэтому результат с окном совпадает с полным обходом, обрезанным по окну.
+    """
     points = []
     dx = x2 - x1
     dy = y2 - y1
     steps = max(abs(dx), abs(dy))
     x_inc = dx / steps
     y_inc = dy / steps
-    x, y = x1, y1
-    for _ in range(int(steps) + 1):
-        points.append((round(x), round(y)))
-        x += x_inc
-        y += y_inc
+    first, last = 0, int(steps)
+    if viewport is not None:
+        first, last = _clip_steps(
+            int(steps),
+            lambda k: round(x1 + k * x_inc), lambda k: round(y1 + k * y_inc),
+            dx, dy, viewport)
+    for k in range(first, last + 1):
+        points.append((round(x1 + k * x_inc), round(y1 + k * y_inc)))
     return points
 
-def bresenham_algorithm(x1, y1, x2, y2):
-    """Алгоритм Брезенхема"""
+def bresenham_algorithm(x1, y1, x2, y2, viewport=None):
+    """
+    Алгоритм Брезенхема.
+    - viewport: необязательное окно (x_min, y_min, x_max, y_max); если задано,
+      ошибка инициализируется сразу в первом видимом пикселе и обход
+      ограничивается видимой частью отрезка.
+    """
     points = []
     dx = abs(x2 - x1)
     dy = abs(y2 - y1)
@@ -24,6 +75,35 @@ def bresenham_algorithm(x1, y1, x2, y2):
     sy = 1 if y2 > y1 else -1
     err = dx - dy
     x, y = x1, y1
+    if viewport is not None:
+        # На каждом шаге сдвигается ведущая ось, а число сдвигов по второй
+        # оси после k шагов равно ceil((2k * minor - major) / (2 * major))
+        major, minor = max(dx, dy), min(dx, dy)
+
+        def minor_steps(k):
+            return -((major - 2 * k * minor) // (2 * major)) if major else 0
+
+        if dx > dy:
+            x_at = lambda k: x1 + sx * k
+            y_at = lambda k: y1 + sy * minor_steps(k)
+        else:
+            x_at = lambda k: x1 + sx * minor_steps(k)
+            y_at = lambda k: y1 + sy * k
+        first, last = _clip_steps(major, x_at, y_at, sx, sy, viewport)
+        if first > last:
+            return points
+        x, y = x_at(first), y_at(first)
+        err += dx * ((y - y1) * sy) - dy * ((x - x1) * sx)
+        for _ in range(last - first + 1):
+            points.append((x, y))
+            e2 = err * 2
+            if e2 > -dy:
+                err -= dy
+                x += sx
+            if e2 < dx:
+                err += dx
+                y += sy
+        return points
     while True:
         points.append((x, y))
         if x == x2 and y == y2:
@@ -67,6 +147,115 @@ def bresenham_integer_algorithm(x1, y1, x2, y2):
         points.append((x1, y1))
     return points
 
+def _bresenham_coords(x1, y1, dx, dy, k):
+    """
+    Координаты k-го пикселя целочисленного алгоритма Брезенхема в замкнутой форме.
+    Все аргументы - скаляры или массивы одинаковой формы.
+    """
+    sx = np.where(dx > 0, 1, -1)
+    sy = np.where(dy > 0, 1, -1)
+    dx, dy = np.abs(dx), np.abs(dy)
+
+    # Ведущая ось - X при dx > dy, иначе Y (как в скалярной версии)
+    x_major = dx > dy
+    major = np.maximum(dx, dy)
+    minor = np.minimum(dx, dy)
+
+    # Число шагов по второстепенной оси после k итераций:
+    # ошибка err = major // 2 - k * minor + m * major остаётся в [0, major)
+    major_s = np.maximum(major, 1)
+    m = (k * minor - major // 2 + major_s - 1) // major_s
+
+    xs = x1 + sx * np.where(x_major, k, m)
+    ys = y1 + sy * np.where(x_major, m, k)
+    return xs, ys
+
+def bresenham_batch(segments):
+    """
+    Пакетный целочисленный алгоритм Брезенхема.
+    - segments: массив (N, 4) с концами отрезков (x1, y1, x2, y2).
+    Возвращает плоские массивы xs, ys и массив смещений offsets длины N + 1:
+    пиксели отрезка i лежат в xs[offsets[i]:offsets[i + 1]].
+    Результат попиксельно совпадает с bresenham_integer_algorithm.
+    """
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx = x2 - x1
+    dy = y2 - y1
+
+    lengths = np.maximum(np.abs(dx), np.abs(dy)) + 1
+    offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Номер шага k внутри своего отрезка для каждого пикселя
+    seg = np.repeat(np.arange(len(segments)), lengths)
+    k = np.arange(offsets[-1], dtype=np.int64) - offsets[seg]
+
+    xs, ys = _bresenham_coords(x1[seg], y1[seg], dx[seg], dy[seg], k)
+    return xs, ys, offsets
+
+def bresenham_iter(x1, y1, x2, y2):
+    """Потоковый целочисленный алгоритм Брезенхема: генератор точек без списка."""
+    dx = x2 - x1
+    dy = y2 - y1
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    dx, dy = abs(dx), abs(dy)
+    if dx > dy:
+        err = dx // 2
+        while x1 != x2:
+            yield x1, y1
+            err -= dy
+            if err < 0:
+                y1 += sy
+                err += dx
+            x1 += sx
+    else:
+        err = dy // 2
+        while y1 != y2:
+            yield x1, y1
+            err -= dx
+            if err < 0:
+                x1 += sx
+                err += dy
+            y1 += sy
+    yield x1, y1
+
+def _put_pixels(buffer, xs, ys, color, additive):
+    """Записывает пиксели в кадровый буфер, отбрасывая точки за его пределами."""
+    height, width = buffer.shape[:2]
+    visible = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    xs, ys = xs[visible], ys[visible]
+    if not additive:
+        buffer[ys, xs] = color
+        return
+    # Аддитивное смешивание с насыщением; повторяющиеся пиксели суммируются
+    flat, counts = np.unique(ys * width + xs, return_counts=True)
+    ys, xs = flat // width, flat % width
+    total = buffer[ys, xs].astype(np.uint64) + counts.astype(np.uint64) * np.uint64(color)
+    buffer[ys, xs] = np.minimum(total, np.iinfo(buffer.dtype).max)
+
+def draw_line(buffer, x1, y1, x2, y2, color=255, additive=False, chunk_size=1 << 16):
+    """
+    Растеризует отрезок прямо в кадровый буфер (2-D массив uint8/uint32).
+    - color: значение пикселя; при additive=True прибавляется к буферу с насыщением.
+    - chunk_size: число пикселей, обрабатываемых за раз (ограничивает память).
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+    length = max(abs(dx), abs(dy)) + 1
+    for start in range(0, length, chunk_size):
+        k = np.arange(start, min(start + chunk_size, length), dtype=np.int64)
+        xs, ys = _bresenham_coords(x1, y1, dx, dy, k)
+        _put_pixels(buffer, xs, ys, color, additive)
+    return buffer
+
+def draw_lines(buffer, segments, color=255, additive=False):
+    """Растеризует массив отрезков (N, 4) в кадровый буфер за один вызов."""
+    xs, ys, _ = bresenham_batch(segments)
+    _put_pixels(buffer, xs, ys, color, additive)
+    return buffer
+
 def plot_line(points, title):
     """Функция для отрисовки линии"""
     x, y = zip(*points)
@@ -10,6 +10,26 @@ def apply_affine_transformation(image, transformation_matrix, interpolation):
     transformed = cv2.warpAffine(image, transformation_matrix, (cols, rows), flags=interpolation)
     return transformed
 
+def compose_affine(*matrices):
+    """
+    Сворачивает последовательность аффинных матриц 2x3 (в порядке применения)
+    в одну матрицу 2x3: M = M_n @ ... @ M_1.
+    """
+    result = np.eye(3)
+    for matrix in matrices:
+        result = np.vstack([matrix, [0, 0, 1]]) @ result
+    return result[:2].astype(np.float32)
+
+def apply_affine_chain(image, matrices, interpolation):
+    """
+    Применяет цепочку аффинных преобразований одной передискретизацией
+    вместо последовательных вызовов warpAffine; тождественная цепочка не пересчитывается.
+    """
+    matrix = compose_affine(*matrices)
+    if np.allclose(matrix, np.eye(2, 3), rtol=0, atol=1e-7):
+        return image.copy()
+    return apply_affine_transformation(image, matrix, interpolation)
+
 def main():
     # Загружаем изображение
     image_path = "input.jpg"
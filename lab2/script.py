@@ -1,3 +1,6 @@
+from functools import lru_cache
+
+import numpy as np
 import matplotlib.pyplot as plt
 
 def bresenham_circle(cx, cy, radius):
@@ -28,6 +31,118 @@ def bresenham_circle(cx, cy, radius):
         add_symmetric_points(cx, cy, x, y, points)
     return points
 
+@lru_cache(maxsize=128)
+def circle_offsets(radius):
+    """
+    Смещения пикселей окружности радиуса radius относительно центра.
+    Возвращает массив (K, 2) без повторяющихся точек на осях и диагоналях.
+    Результат кэшируется (LRU) и доступен только для чтения.
+    """
+    # Одна октанта по тому же рекуррентному соотношению, что и bresenham_circle
+    octant = [(0, radius)]
+    x, y = 0, radius
+    d = 3 - 2 * radius
+    while x < y:
+        if d < 0:
+            d = d + 4 * x + 6
+        else:
+            d = d + 4 * (x - y) + 10
+            y -= 1
+        x += 1
+        octant.append((x, y))
+
+    x, y = np.array(octant, dtype=np.int64).T
+    offsets = np.concatenate([
+        np.stack([sx * a, sy * b], axis=1)
+        for a, b in ((x, y), (y, x))
+        for sx in (1, -1)
+        for sy in (1, -1)
+    ])
+    offsets = np.unique(offsets, axis=0)
+    offsets.setflags(write=False)
+    return offsets
+
+def circle_points(cx, cy, radius, viewport=None):
+    """
+    Точки окружности с центром (cx, cy) в виде массива (K, 2).
+    - viewport: необязательное окно (x_min, y_min, x_max, y_max) для отсечения.
+    """
+    points = circle_offsets(radius) + (cx, cy)
+    if viewport is not None:
+        x_min, y_min, x_max, y_max = viewport
+        x, y = points[:, 0], points[:, 1]
+        points = points[(x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)]
+    return points
+
+def draw_circle(buffer, cx, cy, radius, color=255):
+    """Рисует окружность прямо в 2-D массив buffer (строка - y, столбец - x)."""
+    height, width = buffer.shape[:2]
+    points = circle_points(cx, cy, radius, viewport=(0, 0, width - 1, height - 1))
+    buffer[points[:, 1], points[:, 0]] = color
+    return buffer
+
+@lru_cache(maxsize=128)
+def _row_extents(radius):
+    """
+    Для каждой строки dy из [-radius, radius] возвращает наименьший и наибольший
+    |dx| среди точек окружности в этой строке (массивы длины 2 * radius + 1).
+    """
+    offsets = circle_offsets(radius)
+    rows = offsets[:, 1] + radius
+    dx = np.abs(offsets[:, 0])
+    inner = np.full(2 * radius + 1, radius, dtype=np.int64)
+    outer = np.zeros(2 * radius + 1, dtype=np.int64)
+    np.minimum.at(inner, rows, dx)
+    np.maximum.at(outer, rows, dx)
+    inner.setflags(write=False)
+    outer.setflags(write=False)
+    return inner, outer
+
+def disk_spans(cx, cy, radius):
+    """
+    Закрашенный круг в виде горизонтальных отрезков (y, x_start, x_end),
+    границы включительно. Граница круга совпадает с bresenham_circle.
+    """
+    _, outer = _row_extents(radius)
+    y = np.arange(cy - radius, cy + radius + 1)
+    return np.stack([y, cx - outer, cx + outer], axis=1)
+
+def annulus_spans(cx, cy, inner_radius, outer_radius):
+    """
+    Кольцо между окружностями inner_radius и outer_radius (обе границы входят)
+    в виде горизонтальных отрезков (y, x_start, x_end).
+    """
+    if not 0 <= inner_radius <= outer_radius:
+        raise ValueError("Должно выполняться 0 <= inner_radius <= outer_radius!")
+    _, outer = _row_extents(outer_radius)
+    inner, _ = _row_extents(inner_radius)
+
+    # Внутренний радиус перекрывает только центральные строки
+    hole = np.full(2 * outer_radius + 1, -1, dtype=np.int64)
+    shift = outer_radius - inner_radius
+    hole[shift:shift + 2 * inner_radius + 1] = inner
+    y = np.arange(cy - outer_radius, cy + outer_radius + 1)
+
+    # Строки без отверстия (или где оно вырождено в точку) дают один отрезок
+    whole = hole <= 0
+    left = ~whole
+    spans = np.concatenate([
+        np.stack([y[whole], cx - outer[whole], cx + outer[whole]], axis=1),
+        np.stack([y[left], cx - outer[left], cx - hole[left]], axis=1),
+        np.stack([y[left], cx + hole[left], cx + outer[left]], axis=1),
+    ])
+    return spans[np.lexsort((spans[:, 1], spans[:, 0]))]
+
+def fill_spans(mask, spans, value=255):
+    """Заполняет отрезки (y, x_start, x_end) в 2-D маске, по одному срезу на отрезок."""
+    height, width = mask.shape[:2]
+    for y, x_start, x_end in spans.tolist():
+        # Отрезки за границами маски пропускаются (отрицательный конец среза
+        # numpy отсчитал бы от правого края)
+        if 0 <= y < height and x_end >= 0 and x_start < width:
+            mask[y, max(x_start, 0):min(x_end + 1, width)] = value
+    return mask
+
 def plot_circle(points, title):
     """Функция для отрисовки окружности"""
     x, y = zip(*points)
@@ -44,5 +159,5 @@ if __name__ == "__main__":
     radius = int(input("Введите радиус окружности: "))
 
     # Алгоритм Брезенхема для окружности
-    circle_points = bresenham_circle(cx, cy, radius)
-    plot_circle(circle_points, "Алгоритм Брезенхема для окружности")
+    points = bresenham_circle(cx, cy, radius)
+    plot_circle(points, "Алгоритм Брезенхема для окружности")
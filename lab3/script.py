@@ -1,3 +1,13 @@
+import argparse
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
 from PIL import Image
 
 def invert_pixel(pixel):
@@ -5,49 +15,288 @@ def invert_pixel(pixel):
     r, g, b = pixel
     return 255 - r, 255 - g, 255 - b
 
+def invert_array(pixels, out=None):
+    """Инверсия цветов массива uint8 одной операцией; out=pixels - на месте."""
+    return np.subtract(np.uint8(255), pixels, out=out, dtype=np.uint8)
+
 def invert_image(image):
-    """Попиксельная обработка: инверсия цветов всего изображения."""
-    width, height = image.size
-    pixels = image.load()
+    """Инверсия цветов всего изображения (изображение изменяется на месте)."""
+    pixels = invert_array(np.asarray(image))
+    image.frombytes(pixels)
+    return image
 
-    for x in range(width):
-        for y in range(height):
-            pixels[x, y] = invert_pixel(pixels[x, y])
+@lru_cache(maxsize=16)
+def _blend_table(alpha):
+    """
+    Таблица 256x256 результатов int(c1 * (1 - alpha) + c2 * alpha) для всех пар
+    значений каналов. Вычисляется один раз на alpha с той же арифметикой
+    двойной точности, что и попиксельная версия, поэтому результат совпадает побайтно.
+    """
+    c1 = np.arange(256, dtype=np.float64)[:, None]
+    c2 = np.arange(256, dtype=np.float64)[None, :]
+    table = np.clip(np.trunc(c1 * (1 - alpha) + c2 * alpha), 0, 255).astype(np.uint8)
+    table = table.ravel()
+    table.setflags(write=False)
+    return table
 
-    return image
+def blend_arrays(pixels1, pixels2, alpha=0.5, out=None):
+    """
+    Наложение двух массивов uint8 одинаковой формы.
+    Вместо вещественных вычислений над изображением каждый байт результата
+    выбирается из таблицы по 16-битному индексу (c1 << 8) | c2.
+    - out: массив для результата; out=pixels1 даёт наложение на месте.
+    """
+    if pixels1.shape != pixels2.shape:
+        raise ValueError("Размеры изображений должны совпадать!")
+    index = pixels1.astype(np.uint16)
+    index <<= 8
+    index |= pixels2
+    if out is None:
+        out = np.empty(pixels1.shape, dtype=np.uint8)
+    return np.take(_blend_table(float(alpha)), index, out=out)
 
 def blend_images(image1, image2, alpha=0.5):
     """
-    Наложение двух изображений вручную.
+    Наложение двух изображений.
     - image1, image2: изображения одинакового размера.
     - alpha: коэффициент смешивания (0 - только image1, 1 - только image2).
     """
     if image1.size != image2.size:
         raise ValueError("Размеры изображений должны совпадать!")
 
-    width, height = image1.size
-    pixels1 = image1.load()
-    pixels2 = image2.load()
+    blended = blend_arrays(np.asarray(image1), np.asarray(image2), alpha)
+    return Image.fromarray(blended, "RGB")
+
+def composite_layers(layers, alphas=None, tile_bytes=4 * 2 ** 20):
+    """
+    Наложение стопки из K слоёв за один проход по результату.
+    - layers: массивы uint8 (H, W, 3) или (H, W, 4) одинакового размера, снизу вверх;
+      у RGBA-слоёв используется попиксельная прозрачность.
+    - alphas: коэффициенты непрозрачности слоёв (скаляры, по умолчанию 1),
+      умножаются на попиксельную прозрачность.
+    Слои накладываются оператором "over" в предумноженных по альфе цветах;
+    накопители float32 размером в одну полосу строк остаются в кэше, поэтому
+    результат записывается один раз. Возвращает RGBA-массив uint8.
+    """
+    if alphas is None:
+        alphas = [1.0] * len(layers)
+    if len(alphas) != len(layers):
+        raise ValueError("Число коэффициентов alpha должно совпадать с числом слоёв!")
+    height, width = layers[0].shape[:2]
+    if any(layer.shape[:2] != (height, width) for layer in layers):
+        raise ValueError("Размеры изображений должны совпадать!")
+
+    result = np.empty((height, width, 4), dtype=np.uint8)
+    rows = max(1, tile_bytes // (width * 16))
+    for start in range(0, height, rows):
+        band = slice(start, start + rows)
+        band_height = len(result[band])
+        color = np.zeros((band_height, width, 3), dtype=np.float32)
+        coverage = np.zeros((band_height, width, 1), dtype=np.float32)
+
+        for layer, alpha in zip(layers, alphas):
+            pixels = layer[band]
+            if pixels.shape[2] == 4:
+                opacity = pixels[..., 3:].astype(np.float32)
+                opacity *= np.float32(alpha / 255)
+            else:
+                opacity = np.float32(alpha)
+            # C = c * a + C * (1 - a), A = a + A * (1 - a)
+            transparency = 1 - opacity
+            color *= transparency
+            color += pixels[..., :3] * opacity
+            coverage *= transparency
+            coverage += opacity
+
+        # Переход от предумноженных цветов к обычным
+        np.divide(color, coverage, out=color, where=coverage > 0)
+        result[band, :, :3] = np.clip(np.rint(color), 0, 255)
+        result[band, :, 3:] = np.clip(np.rint(coverage * 255), 0, 255)
+    return result
+
+def composite_images(images, alphas=None):
+    """Наложение стопки изображений PIL (снизу вверх); возвращает RGBA-изображение."""
+    layers = [np.asarray(image if image.mode in ("RGB", "RGBA") else image.convert("RGBA"))
+              for image in images]
+    return Image.fromarray(composite_layers(layers, alphas), "RGBA")
+
+def _open_pixels(path, shape=None, mode="r"):
+    """
+    Отображает файл с пикселями uint8 в память: .npy - через заголовок файла,
+    иначе - как сырые байты формы shape (высота, ширина, каналы).
+    """
+    if str(path).endswith(".npy"):
+        if mode == "r":
+            return np.load(path, mmap_mode="r")
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+    if shape is None:
+        raise ValueError("Для сырого файла необходимо указать shape!")
+    return np.memmap(path, dtype=np.uint8, mode=mode, shape=shape)
+
+def blend_files(input_path1, input_path2, output_path, alpha=0.5, shape=None,
+                tile_bytes=64 * 2 ** 20):
+    """
+    Наложение изображений, не помещающихся в память, полосами строк.
+    - input_path1, input_path2: файлы .npy или сырые RGB-файлы формы shape.
+    - output_path: файл результата (.npy или сырой), также отображаемый в память.
+    - tile_bytes: примерный объём одной полосы; пиковая память ограничена
+      несколькими полосами независимо от размера изображения.
+    Результат совпадает с blend_images для всего изображения.
+    """
+    pixels1 = _open_pixels(input_path1, shape)
+    pixels2 = _open_pixels(input_path2, shape)
+    if pixels1.shape != pixels2.shape:
+        raise ValueError("Размеры изображений должны совпадать!")
+    result = _open_pixels(output_path, pixels1.shape, mode="w+")
+
+    row_bytes = pixels1[0].nbytes if len(pixels1) else 1
+    rows = max(1, tile_bytes // row_bytes)
+    for start in range(0, len(pixels1), rows):
+        band = slice(start, start + rows)
+        blend_arrays(pixels1[band], pixels2[band], alpha, out=result[band])
+    result.flush()
+    return result
+
+# Этапы пакетной обработки и их названия в отчёте
+STAGES = {"decode": "Декодирование", "compute": "Вычисления", "encode": "Кодирование"}
+
+def find_pairs(directory1, directory2):
+    """Пары файлов с одинаковыми именами из двух каталогов."""
+    directory1, directory2 = Path(directory1), Path(directory2)
+    return [(path, directory2 / path.name)
+            for path in sorted(directory1.iterdir())
+            if path.is_file() and (directory2 / path.name).is_file()]
+
+def read_manifest(manifest_path):
+    """Пары файлов из CSV-манифеста: по одной паре (image1, image2) в строке."""
+    with open(manifest_path, newline="") as manifest:
+        return [(Path(row[0]), Path(row[1])) for row in csv.reader(manifest) if row]
+
+def _is_up_to_date(output_path, input_paths):
+    """Результат существует и не старше ни одного из входных файлов."""
+    if not output_path.exists():
+        return False
+    mtime = output_path.stat().st_mtime
+    return all(mtime >= path.stat().st_mtime for path in input_paths)
+
+def process_pair(job):
+    """
+    Инверсия и наложение одной пары изображений (выполняется в рабочем процессе).
+    Возвращает время и объём данных для каждого этапа.
+    """
+    input_path1, input_path2, inverted_path, blended_path, alpha = job
+    stats = {stage: [0.0, 0] for stage in STAGES}
+    try:
+        start = time.perf_counter()
+        image1 = Image.open(input_path1).convert("RGB")
+        image2 = Image.open(input_path2).convert("RGB")
+        stats["decode"] = [time.perf_counter() - start,
+                           os.path.getsize(input_path1) + os.path.getsize(input_path2)]
+
+        start = time.perf_counter()
+        pixels1 = np.asarray(image1)
+        inverted = Image.fromarray(invert_array(pixels1), "RGB")
+        blended = Image.fromarray(blend_arrays(pixels1, np.asarray(image2), alpha), "RGB")
+        stats["compute"] = [time.perf_counter() - start, pixels1.nbytes * 2]
+
+        start = time.perf_counter()
+        inverted.save(inverted_path)
+        blended.save(blended_path)
+        stats["encode"] = [time.perf_counter() - start,
+                           os.path.getsize(inverted_path) + os.path.getsize(blended_path)]
+    except Exception as error:
+        stats["error"] = f"{input_path1}, {input_path2}: {error}"
+    return stats
+
+def _output_names(pairs):
+    """
+    Имена выходных файлов для пар: имя первого изображения, а при совпадении
+    имён у разных пар (манифест со входами из разных каталогов) - с номером
+    строки в начале, чтобы результаты не перезаписывали друг друга.
+    """
+    names = [Path(input_path1).name for input_path1, _ in pairs]
+    counts = Counter(names)
+    return [name if counts[name] == 1 else f"{index:06d}_{name}"
+            for index, name in enumerate(names)]
+
+def run_batch(pairs, output_dir, alpha=0.5, workers=None):
+    """
+    Пакетная инверсия и наложение пар изображений в пуле процессов.
+    - pairs: список пар путей (image1, image2).
+    - output_dir: результаты пишутся в подкаталоги inverted/ и blended/.
+    - workers: число процессов (по умолчанию - число ядер).
+    Пары, результаты которых новее входных файлов, пропускаются.
+    Декодирование, вычисления и кодирование разных пар идут параллельно
+    в разных процессах. Ошибка в одной паре не прерывает пакет: такие пары
+    перечисляются в summary["failed"]. Возвращает сводку по этапам.
+    """
+    output_dir = Path(output_dir)
+    (output_dir / "inverted").mkdir(parents=True, exist_ok=True)
+    (output_dir / "blended").mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for (input_path1, input_path2), name in zip(pairs, _output_names(pairs)):
+        inverted_path = output_dir / "inverted" / name
+        blended_path = output_dir / "blended" / name
+        inputs = (Path(input_path1), Path(input_path2))
+        if _is_up_to_date(inverted_path, inputs) and _is_up_to_date(blended_path, inputs):
+            continue
+        jobs.append((input_path1, input_path2, inverted_path, blended_path, alpha))
+
+    summary = {stage: [0.0, 0] for stage in STAGES}
+    errors = []
+    start = time.perf_counter()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            for stats in executor.map(process_pair, jobs, chunksize=4):
+                if "error" in stats:
+                    errors.append(stats["error"])
+                    continue
+                for stage in STAGES:
+                    summary[stage][0] += stats[stage][0]
+                    summary[stage][1] += stats[stage][1]
+    summary["wall"] = time.perf_counter() - start
+    summary["processed"] = len(jobs) - len(errors)
+    summary["skipped"] = len(pairs) - len(jobs)
+    summary["failed"] = errors
+    return summary
 
-    # Результирующее изображение
-    blended_image = Image.new("RGB", (width, height))
-    blended_pixels = blended_image.load()
+def print_summary(summary):
+    """Выводит пропускную способность по этапам (изображений/с и МБ/с)."""
+    count = summary["processed"]
+    print(f"Обработано пар: {count}, пропущено (актуальны): {summary['skipped']}, "
+          f"с ошибками: {len(summary['failed'])}")
+    for error in summary["failed"]:
+        print(f"  Ошибка: {error}")
+    if not count:
+        return
+    print(f"Общая скорость: {count / summary['wall']:.1f} пар/с")
+    for stage, title in STAGES.items():
+        seconds, size = summary[stage]
+        seconds = max(seconds, 1e-9)
+        print(f"  {title}: {count / seconds:.1f} пар/с, "
+              f"{size / seconds / 2 ** 20:.1f} МБ/с (на один процесс)")
 
-    for x in range(width):
-        for y in range(height):
-            r1, g1, b1 = pixels1[x, y]
-            r2, g2, b2 = pixels2[x, y]
+def parse_args(argv=None):
+    """Разбор аргументов командной строки; без них обрабатывается одна пара по умолчанию."""
+    parser = argparse.ArgumentParser(description="Инверсия и наложение изображений.")
+    parser.add_argument("--dir1", help="каталог с первыми изображениями пар")
+    parser.add_argument("--dir2", help="каталог со вторыми изображениями пар")
+    parser.add_argument("--manifest", help="CSV-файл с парами путей")
+    parser.add_argument("--output", default="output", help="каталог для результатов")
+    parser.add_argument("--alpha", type=float, default=0.5, help="коэффициент смешивания")
+    parser.add_argument("--workers", type=int, help="число процессов")
+    return parser.parse_args(argv)
 
-            # Смешивание цветов пикселей
-            blended_pixels[x, y] = (
-                int(r1 * (1 - alpha) + r2 * alpha),
-                int(g1 * (1 - alpha) + g2 * alpha),
-                int(b1 * (1 - alpha) + b2 * alpha)
-            )
+def main(argv=None):
+    args = parse_args(argv)
 
-    return blended_image
+    # Пакетный режим: каталоги или манифест
+    if args.manifest or (args.dir1 and args.dir2):
+        pairs = read_manifest(args.manifest) if args.manifest else find_pairs(args.dir1, args.dir2)
+        print_summary(run_batch(pairs, args.output, args.alpha, args.workers))
+        return
 
-def main():
     # Пути к файлам
     input_image1_path = "input1.jpg"
     input_image2_path = "input2.jpg"
@@ -64,7 +313,7 @@ def main():
     print(f"Обработанное изображение сохранено как {output_inverted_path}")
 
     # Наложение изображений
-    blended_image = blend_images(image1, image2, alpha=0.5)
+    blended_image = blend_images(image1, image2, alpha=args.alpha)
     blended_image.save(output_blended_path)
     print(f"Наложенное изображение сохранено как {output_blended_path}")
 
@@ -1,66 +1,379 @@
+from functools import lru_cache
+
 import numpy as np
 from PIL import Image
 
-def affine_transform(image, scale=(1, 1), translate=(0, 0)):
-    """Аффинное преобразование: масштабирование и перенос."""
-    width, height = image.size
+def _snap(coords, eps=1e-9):
+    """
+    Прижимает координаты, отличающиеся от целого лишь ошибкой округления, к целому,
+    чтобы отбрасывание дробной части не зависело от порядка вычислений.
+    """
+    rounded = np.rint(coords)
+    return np.where(np.abs(coords - rounded) <= eps * np.maximum(1, np.abs(coords)), rounded, coords)
+
+def _sample(pixels, src_x, src_y, interpolation="nearest", fill=0):
+    """
+    Выборка пикселей исходного массива в точках (src_x, src_y).
+    - nearest: дробная часть отбрасывается (как int(...) в попиксельной версии);
+    - bilinear: билинейная интерполяция по четырём соседям.
+    Точки вне изображения (и соседи вне его при bilinear) принимают значение fill.
+    """
+    src_x, src_y = np.broadcast_arrays(src_x, src_y)
+    height, width = pixels.shape[:2]
+    channels = pixels.shape[2:]
+    fill = np.broadcast_to(np.asarray(fill, dtype=np.float64), channels or ())
+
+    if interpolation == "nearest":
+        x = np.trunc(src_x).astype(np.int64)
+        y = np.trunc(src_y).astype(np.int64)
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        result = np.empty(src_x.shape + channels, dtype=pixels.dtype)
+        result[...] = fill.astype(pixels.dtype)
+        result[inside] = pixels[y[inside], x[inside]]
+        return result
+
+    if interpolation != "bilinear":
+        raise ValueError(f"Неизвестный метод интерполяции: {interpolation}")
+
+    x0 = np.floor(src_x).astype(np.int64)
+    y0 = np.floor(src_y).astype(np.int64)
+    fx = src_x - x0
+    fy = src_y - y0
+    result = np.zeros(src_x.shape + channels, dtype=np.float64)
+    for dx, dy, weight in ((0, 0, (1 - fx) * (1 - fy)), (1, 0, fx * (1 - fy)),
+                           (0, 1, (1 - fx) * fy), (1, 1, fx * fy)):
+        x, y = x0 + dx, y0 + dy
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        values = np.empty(src_x.shape + channels, dtype=np.float64)
+        values[...] = fill
+        values[inside] = pixels[y[inside], x[inside]]
+        if channels:
+            weight = weight[..., None]
+        result += values * weight
+    if np.issubdtype(pixels.dtype, np.integer):
+        limits = np.iinfo(pixels.dtype)
+        result = np.clip(np.rint(result), limits.min, limits.max)
+    return result.astype(pixels.dtype)
+
+def warp_affine_array(pixels, matrix, output_size, interpolation="nearest", fill=0):
+    """
+    Аффинное преобразование массива (H, W[, C]) произвольной матрицей 2x3.
+    Матрица переводит координаты (x, y) пикселя результата в координаты источника:
+    src = matrix @ (x, y, 1). output_size - (ширина, высота) результата.
+    Для матриц без поворота и скоса координаты считаются отдельно для
+    столбцов и строк. При nearest координаты прижимаются к целым в пределах
+    ошибки округления, поэтому составные матрицы дают тот же результат, что и точные.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    new_width, new_height = output_size
+    x = np.arange(new_width, dtype=np.float64)[None, :]
+    y = np.arange(new_height, dtype=np.float64)[:, None]
+    if matrix[0, 1] == 0 and matrix[1, 0] == 0:
+        src_x = x * matrix[0, 0] + matrix[0, 2]
+        src_y = y * matrix[1, 1] + matrix[1, 2]
+    else:
+        src_x = matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2]
+        src_y = matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2]
+    if interpolation == "nearest":
+        src_x, src_y = _snap(src_x), _snap(src_y)
+    return _sample(pixels, src_x, src_y, interpolation, fill)
+
+def warp_affine(image, matrix, output_size, interpolation="nearest", fill=0):
+    """Аффинное преобразование изображения PIL матрицей 2x3 (см. warp_affine_array)."""
+    pixels = warp_affine_array(np.asarray(image), matrix, output_size, interpolation, fill)
+    return Image.fromarray(pixels, image.mode)
+
+def _affine_coords(size, scale, translate):
+    """
+    Размер результата и координаты источника для affine_transform:
+    src = (dst - translate) / scale. Координаты считаются по столбцам и строкам
+    тем же выражением, что и в попиксельной версии, чтобы результат совпадал побайтно.
+    """
+    width, height = size
     new_width = int(width * scale[0])
     new_height = int(height * scale[1])
+    src_x = (np.arange(new_width)[None, :] - translate[0]) / scale[0]
+    src_y = (np.arange(new_height)[:, None] - translate[1]) / scale[1]
+    return (new_width, new_height), src_x, src_y
 
-    # Создаём пустое изображение
-    transformed_image = Image.new("RGB", (new_width, new_height))
-    pixels_original = image.load()
-    pixels_transformed = transformed_image.load()
-
-    # Преобразование координат
-    for x in range(new_width):
-        for y in range(new_height):
-            src_x = int((x - translate[0]) / scale[0])
-            src_y = int((y - translate[1]) / scale[1])
-            if 0 <= src_x < width and 0 <= src_y < height:
-                pixels_transformed[x, y] = pixels_original[src_x, src_y]
-    
-    return transformed_image
-
-def inverse_affine_transform(image, scale=(1, 1), translate=(0, 0), original_size=(0, 0)):
-    """Обратное аффинное преобразование."""
+def _inverse_affine_coords(scale, translate, original_size):
+    """Размер результата и координаты источника для inverse_affine_transform: src = dst * scale + translate."""
     width, height = original_size
-    transformed_width, transformed_height = image.size
-
-    # Создаём пустое изображение
-    restored_image = Image.new("RGB", (width, height))
-    pixels_transformed = image.load()
-    pixels_restored = restored_image.load()
-
-    # Преобразование координат
-    for x in range(width):
-        for y in range(height):
-            src_x = int(x * scale[0] + translate[0])
-            src_y = int(y * scale[1] + translate[1])
-            if 0 <= src_x < transformed_width and 0 <= src_y < transformed_height:
-                pixels_restored[x, y] = pixels_transformed[src_x, src_y]
-    
-    return restored_image
-
-def nonlinear_transform(image):
+    src_x = np.arange(width)[None, :] * scale[0] + translate[0]
+    src_y = np.arange(height)[:, None] * scale[1] + translate[1]
+    return (width, height), src_x, src_y
+
+def affine_transform(image, scale=(1, 1), translate=(0, 0), interpolation="nearest"):
+    """Аффинное преобразование: масштабирование и перенос."""
+    _, src_x, src_y = _affine_coords(image.size, scale, translate)
+    pixels = _sample(np.asarray(image), src_x, src_y, interpolation)
+    return Image.fromarray(pixels, image.mode)
+
+def inverse_affine_transform(image, scale=(1, 1), translate=(0, 0), original_size=(0, 0),
+                             interpolation="nearest"):
+    """Обратное аффинное преобразование."""
+    _, src_x, src_y = _inverse_affine_coords(scale, translate, original_size)
+    pixels = _sample(np.asarray(image), src_x, src_y, interpolation)
+    return Image.fromarray(pixels, image.mode)
+
+def warp_inverse_array(pixels, mapping, output_size, interpolation="nearest", fill=0):
+    """
+    Обратное (gather) преобразование координат.
+    - mapping(x, y) -> (src_x, src_y): векторизованная функция (совместимая с ufunc),
+      переводящая координаты результата в координаты источника.
+    Функция вызывается для строки x формы (1, W) и столбца y формы (H, 1), поэтому
+    разделимые отображения вычисляются один раз на столбец/строку.
+    """
+    new_width, new_height = output_size
+    x = np.arange(new_width)[None, :]
+    y = np.arange(new_height)[:, None]
+    src_x, src_y = mapping(x, y)
+    return _sample(pixels, src_x, src_y, interpolation, fill)
+
+def warp_forward_array(pixels, mapping, output_size, collision="last", fill=0):
+    """
+    Прямое (scatter) преобразование координат.
+    - mapping(x, y) -> (dst_x, dst_y): векторизованная функция, переводящая
+      координаты источника в координаты результата (дробная часть отбрасывается,
+      точки вне результата пропускаются). Вызывается так же, как в warp_inverse_array.
+    - collision: "last" - в пиксель попадает последний записанный пиксель источника
+      (обход по столбцам, как в попиксельной версии), "average" - среднее всех попавших.
+    Незаполненные пиксели результата принимают значение fill.
+    """
+    height, width = pixels.shape[:2]
+    channels = pixels.shape[2:]
+    new_width, new_height = output_size
+    x = np.arange(width)[None, :]
+    y = np.arange(height)[:, None]
+    dst_x, dst_y = np.broadcast_arrays(*mapping(x, y))
+    dst_x = np.trunc(dst_x).astype(np.int64)
+    dst_y = np.trunc(dst_y).astype(np.int64)
+
+    inside = (dst_x >= 0) & (dst_x < new_width) & (dst_y >= 0) & (dst_y < new_height)
+    target = (dst_y * new_width + dst_x)[inside]
+    source = pixels[inside]
+    result = np.empty((new_height * new_width,) + channels, dtype=pixels.dtype)
+    result[...] = fill
+
+    if collision == "last":
+        # Порядок записи: по столбцам x, внутри столбца - по строкам y
+        order = (x * height + y)[inside]
+        winner = np.full(new_height * new_width, -1, dtype=np.int64)
+        np.maximum.at(winner, target, order)
+        written = np.flatnonzero(winner >= 0)
+        rank = np.empty(order.max() + 1 if order.size else 0, dtype=np.int64)
+        rank[order] = np.arange(order.size)
+        result[written] = source[rank[winner[written]]]
+    elif collision == "average":
+        counts = np.bincount(target, minlength=new_height * new_width)
+        written = np.flatnonzero(counts)
+        values = source.reshape(len(source), -1).astype(np.float64)
+        sums = np.stack([np.bincount(target, weights=values[:, c], minlength=len(counts))
+                         for c in range(values.shape[1])], axis=1)
+        average = np.rint(sums[written] / counts[written, None])
+        result[written] = average.reshape((len(written),) + channels).astype(pixels.dtype)
+    else:
+        raise ValueError(f"Неизвестный способ разрешения коллизий: {collision}")
+    return result.reshape((new_height, new_width) + channels)
+
+def exponential_mapping(new_width):
+    """
+    Встроенное отображение i = 2^x', j = y' для warp_forward_array; столбцы,
+    выходящие за ширину new_width, попадают в последний столбец.
+    """
+    def mapping(x, y):
+        # Показатель ограничен, чтобы не получать огромные числа для широких изображений
+        return np.minimum(np.exp2(np.minimum(x, 64)), new_width - 1), y
+    return mapping
+
+def nonlinear_transform(image, collision="last"):
     """Нелинейное преобразование: i = 2^x', j = y'."""
     width, height = image.size
     new_width = int(2 ** (width - 1).bit_length())  # Определяем минимальную степень 2
-    new_height = height
-
-    # Создаём пустое изображение
-    transformed_image = Image.new("RGB", (new_width, new_height))
-    pixels_original = image.load()
-    pixels_transformed = transformed_image.load()
-
-    # Преобразование координат
-    for x in range(width):
-        for y in range(height):
-            transformed_x = int(2 ** x) if 2 ** x < new_width else new_width - 1
-            transformed_y = y
-            pixels_transformed[transformed_x, transformed_y] = pixels_original[x, y]
-    
-    return transformed_image
+    pixels = warp_forward_array(np.asarray(image), exponential_mapping(new_width),
+                                (new_width, height), collision)
+    return Image.fromarray(pixels, image.mode)
+
+def _nonlinear_coords(size):
+    """
+    Размер результата и координаты источника для nonlinear_transform.
+    Прямое отображение x -> 2^x обращается: столбец результата берёт последний
+    записанный в него столбец источника, незаписанные столбцы получают -1 (фон).
+    """
+    width, height = size
+    new_width = 2 ** (width - 1).bit_length()
+    x = np.arange(width)
+    target, _ = exponential_mapping(new_width)(x, 0)
+    src_x = np.full(new_width, -1, dtype=np.int64)
+    np.maximum.at(src_x, target.astype(np.int64), x)
+    return (new_width, height), src_x[None, :], np.arange(height)[:, None]
+
+class RemapTable:
+    """
+    Заранее вычисленная таблица переназначения пикселей для повторяющегося
+    геометрического преобразования кадров одного размера.
+    Хранит целочисленные индексы источника (для bilinear - четыре индекса и веса:
+    с фиксированной точкой для uint8 и вещественные для остальных типов),
+    так что применение к кадру сводится к выборке по индексам.
+    """
+
+    def __init__(self, src_x, src_y, source_size, interpolation="nearest", fill=0):
+        src_x, src_y = np.broadcast_arrays(np.asarray(src_x, dtype=np.float64),
+                                           np.asarray(src_y, dtype=np.float64))
+        self.source_size = tuple(source_size)
+        self.shape = src_x.shape
+        self.interpolation = interpolation
+        self.fill = fill
+        width, height = self.source_size
+
+        if interpolation == "nearest":
+            neighbours = [(np.trunc(src_x), np.trunc(src_y), None)]
+        elif interpolation == "bilinear":
+            x0, y0 = np.floor(src_x), np.floor(src_y)
+            fx, fy = src_x - x0, src_y - y0
+            neighbours = [(x0, y0, (1 - fx) * (1 - fy)), (x0 + 1, y0, fx * (1 - fy)),
+                          (x0, y0 + 1, (1 - fx) * fy), (x0 + 1, y0 + 1, fx * fy)]
+            # Веса с фиксированной точкой: 8 бит на ось, в сумме 1 << 16
+            fx = np.rint(fx * 256).astype(np.uint32)
+            fy = np.rint(fy * 256).astype(np.uint32)
+            fixed = [(256 - fx) * (256 - fy), fx * (256 - fy), (256 - fx) * fy, fx * fy]
+        else:
+            raise ValueError(f"Неизвестный метод интерполяции: {interpolation}")
+
+        self._indices = []
+        self._weights = []
+        self._fill_weight = np.zeros(src_x.size, dtype=np.uint32)
+        self._float_weights = []
+        self._float_fill_weight = np.zeros(src_x.size, dtype=np.float32)
+        for number, (x, y, weight) in enumerate(neighbours):
+            inside = ((x >= 0) & (x < width) & (y >= 0) & (y < height)).ravel()
+            index = np.where(inside, (y * width + x).ravel(), 0).astype(np.intp)
+            self._indices.append(index)
+            if weight is None:
+                self._missing = np.flatnonzero(~inside)
+            else:
+                weight, fixed_weight = weight.ravel(), fixed[number].ravel()
+                self._fill_weight += np.where(inside, 0, fixed_weight).astype(np.uint32)
+                self._weights.append(np.where(inside, fixed_weight, 0).astype(np.uint32))
+                self._float_fill_weight += np.where(inside, 0, weight).astype(np.float32)
+                self._float_weights.append(np.where(inside, weight, 0).astype(np.float32))
+
+    def apply(self, frame, out=None):
+        """Применяет таблицу к кадру (H, W[, C]); out - необязательный массив результата."""
+        width, height = self.source_size
+        if frame.shape[:2] != (height, width):
+            raise ValueError("Размер кадра не совпадает с размером таблицы!")
+        channels = frame.shape[2:]
+        flat = frame.reshape((height * width,) + channels)
+        if out is None:
+            out = np.empty(self.shape + channels, dtype=frame.dtype)
+        result = out.reshape((-1,) + channels)
+        if not len(flat):
+            result[...] = self.fill
+            return out
+
+        if self.interpolation == "nearest":
+            np.take(flat, self._indices[0], axis=0, out=result)
+            result[self._missing] = self.fill
+            return out
+
+        expand = (slice(None),) + (None,) * len(channels)
+        if frame.dtype == np.uint8:
+            acc = np.zeros(result.shape, dtype=np.uint32)
+            for index, weight in zip(self._indices, self._weights):
+                acc += np.take(flat, index, axis=0) * weight[expand]
+            acc += np.asarray(self.fill, dtype=np.uint32) * self._fill_weight[expand]
+            acc += 1 << 15
+            acc >>= 16
+            result[...] = acc
+            return out
+
+        # Прочие типы (uint16, float, ...) - вещественный аккумулятор
+        acc = np.zeros(result.shape, dtype=np.float64)
+        for index, weight in zip(self._indices, self._float_weights):
+            acc += np.take(flat, index, axis=0) * weight[expand]
+        acc += np.asarray(self.fill, dtype=np.float64) * self._float_fill_weight[expand]
+        if np.issubdtype(frame.dtype, np.integer):
+            limits = np.iinfo(frame.dtype)
+            acc = np.clip(np.rint(acc), limits.min, limits.max)
+        result[...] = acc
+        return out
+
+@lru_cache(maxsize=8)
+def _cached_remap_table(transform, input_size, scale, translate, original_size, interpolation):
+    """Строит таблицу переназначения; результаты кэшируются с вытеснением LRU."""
+    if transform == "affine":
+        _, src_x, src_y = _affine_coords(input_size, scale, translate)
+    elif transform == "inverse_affine":
+        _, src_x, src_y = _inverse_affine_coords(scale, translate, original_size)
+    elif transform == "nonlinear":
+        _, src_x, src_y = _nonlinear_coords(input_size)
+    else:
+        raise ValueError(f"Неизвестное преобразование: {transform}")
+    return RemapTable(src_x, src_y, input_size, interpolation)
+
+def get_remap_table(transform, input_size, scale=(1, 1), translate=(0, 0),
+                    original_size=(0, 0), interpolation="nearest"):
+    """
+    Таблица переназначения для преобразования transform ("affine", "inverse_affine"
+    или "nonlinear") кадров размера input_size (ширина, высота).
+    Таблица строится один раз на набор параметров и берётся из LRU-кэша.
+    """
+    return _cached_remap_table(transform, tuple(input_size), tuple(scale), tuple(translate),
+                               tuple(original_size), interpolation)
+
+class TransformChain:
+    """
+    Цепочка аффинных преобразований, свёрнутая в одну матрицу 3x3.
+    Матрица прямая: dst = matrix @ (x, y, 1); каждое новое преобразование
+    применяется после предыдущих. Вся цепочка выполняется одной передискретизацией,
+    а тождественная цепочка - без передискретизации вообще.
+    """
+
+    def __init__(self):
+        self.matrix = np.eye(3)
+
+    def then(self, matrix):
+        """Добавляет в конец цепочки произвольную матрицу 2x3 или 3x3."""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.shape == (2, 3):
+            matrix = np.vstack([matrix, [0, 0, 1]])
+        self.matrix = matrix @ self.matrix
+        return self
+
+    def scale(self, sx, sy=None):
+        """Масштабирование относительно начала координат."""
+        return self.then([[sx, 0, 0], [0, sx if sy is None else sy, 0]])
+
+    def translate(self, tx, ty):
+        """Перенос."""
+        return self.then([[1, 0, tx], [0, 1, ty]])
+
+    def rotate(self, angle, center=(0, 0)):
+        """Поворот на angle градусов против часовой стрелки вокруг center (ось y вниз)."""
+        cos, sin = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+        cx, cy = center
+        return self.then([[cos, sin, cx - cos * cx - sin * cy],
+                          [-sin, cos, cy + sin * cx - cos * cy]])
+
+    def skew(self, kx, ky):
+        """Скос: x' = x + kx * y, y' = y + ky * x."""
+        return self.then([[1, kx, 0], [ky, 1, 0]])
+
+    def is_identity(self, eps=1e-12):
+        """Цепочка не меняет изображение."""
+        return np.allclose(self.matrix, np.eye(3), rtol=0, atol=eps)
+
+    def inverse_matrix(self):
+        """Матрица 2x3, переводящая координаты результата в координаты источника (для warp_affine)."""
+        return np.linalg.inv(self.matrix)[:2]
+
+    def apply(self, image, output_size=None, interpolation="nearest", fill=0):
+        """Применяет всю цепочку к изображению PIL за один проход."""
+        output_size = tuple(output_size or image.size)
+        if self.is_identity() and output_size == image.size:
+            return image.copy()
+        return warp_affine(image, self.inverse_matrix(), output_size, interpolation, fill)
 
 def main():
     # Пути к файлам
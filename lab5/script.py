@@ -1,10 +1,128 @@
+from pathlib import Path
+
 import numpy as np
+import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Line3DCollection
 
 
+class Mesh:
+    """
+    Компактный каркасный многогранник на массивах NumPy.
+    - vertices: float64 (V, 3) - координаты вершин;
+    - edges: int32 (E, 2) - пары индексов вершин;
+    - face_offsets, face_indices: грани в плоском виде, вершины грани i -
+      face_indices[face_offsets[i]:face_offsets[i + 1]].
+    Если рёбра не заданы, они выводятся из граней, а при их отсутствии -
+    как пары ближайших соседей (см. nearest_neighbour_edges).
+    """
+
+    def __init__(self, vertices, edges=None, face_offsets=None, face_indices=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 3)
+        if face_offsets is None:
+            face_offsets = np.zeros(1, dtype=np.int64)
+            face_indices = np.zeros(0, dtype=np.int32)
+        self.face_offsets = np.asarray(face_offsets, dtype=np.int64)
+        self.face_indices = np.asarray(face_indices, dtype=np.int32)
+        if edges is None:
+            edges = self.face_edges() if self.face_count else nearest_neighbour_edges(self.vertices)
+        self.edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+
+    @classmethod
+    def from_triangles(cls, vertices, triangles):
+        """Многогранник с треугольными гранями (T, 3)."""
+        triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        offsets = np.arange(0, 3 * len(triangles) + 1, 3, dtype=np.int64)
+        return cls(vertices, face_offsets=offsets, face_indices=triangles.ravel())
+
+    @property
+    def face_count(self):
+        return len(self.face_offsets) - 1
+
+    def face(self, i):
+        """Индексы вершин i-й грани."""
+        return self.face_indices[self.face_offsets[i]:self.face_offsets[i + 1]]
+
+    def face_edges(self):
+        """Уникальные рёбра всех граней (каждая грань замкнута)."""
+        sizes = np.diff(self.face_offsets)
+        position = np.arange(len(self.face_indices))
+        # Следующая вершина в той же грани; у последней - первая вершина грани
+        following = position + 1
+        last = self.face_offsets[1:] - 1
+        following[last[sizes > 0]] = self.face_offsets[:-1][sizes > 0]
+        pairs = np.stack([self.face_indices, self.face_indices[following]], axis=1)
+        return np.unique(np.sort(pairs, axis=1), axis=0).astype(np.int32)
+
+def _grid_pairs(vertices, radius):
+    """
+    Все пары вершин (i < j) на расстоянии не больше radius.
+    Вершины раскладываются по кубической сетке с шагом radius, и сравниваются
+    только вершины из соседних ячеек; все шаги векторизованы.
+    Возвращает массивы i, j и расстояния.
+    """
+    cells = np.floor((vertices - vertices.min(axis=0)) / radius).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind="stable")
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    result_i, result_j = [], []
+    # Половина соседних ячеек (включая свою), чтобы каждая пара встречалась один раз
+    offsets = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+               if (dx, dy, dz) >= (0, 0, 0)]
+    for dx, dy, dz in offsets:
+        neighbour = cell_keys + (dx * dims[1] + dy) * dims[2] + dz
+        found = np.searchsorted(cell_keys, neighbour)
+        found = np.minimum(found, len(cell_keys) - 1)
+        present = np.flatnonzero(cell_keys[found] == neighbour)
+        a, b = present, found[present]
+
+        # Все пары "вершина ячейки a - вершина ячейки b"
+        sizes = counts[a] * counts[b]
+        group = np.repeat(np.arange(len(a)), sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        i = order[starts[a][group] + local // counts[b][group]]
+        j = order[starts[b][group] + local % counts[b][group]]
+        if (dx, dy, dz) == (0, 0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        result_i.append(i)
+        result_j.append(j)
+
+    i = np.concatenate(result_i)
+    j = np.concatenate(result_j)
+    distance = np.linalg.norm(vertices[i] - vertices[j], axis=1)
+    close = distance <= radius
+    i, j = np.minimum(i, j)[close], np.maximum(i, j)[close]
+    return i, j, distance[close]
+
+def nearest_neighbour_edges(vertices, length=None, rtol=1e-6):
+    """
+    Рёбра как пары вершин на расстоянии length (с относительным допуском rtol).
+    Если length не задана, берётся наименьшее расстояние между вершинами -
+    для правильных многогранников и решёток это и есть длина ребра.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    if len(vertices) < 2:
+        return np.zeros((0, 2), dtype=np.int32)
+    if length is None:
+        extent = np.ptp(vertices, axis=0).max()
+        radius = max(extent / np.cbrt(len(vertices)), np.finfo(float).tiny)
+        while True:
+            i, j, distance = _grid_pairs(vertices, radius)
+            if len(distance):
+                break
+            radius *= 2
+        length = distance.min()
+    else:
+        i, j, distance = _grid_pairs(vertices, length * (1 + rtol))
+    keep = np.abs(distance - length) <= rtol * length
+    edges = np.stack([i[keep], j[keep]], axis=1)
+    return edges[np.lexsort((edges[:, 1], edges[:, 0]))].astype(np.int32)
+
 def create_cube():
-    """Создаёт вершины и рёбра каркасного куба."""
+    """Создаёт каркасный куб."""
     vertices = np.array([
         [-1, -1, -1],
         [-1, -1,  1],
@@ -16,21 +134,12 @@ def create_cube():
         [ 1,  1,  1],
     ])
 
-    edges = [
-        (0, 1), (0, 2), (0, 4),  # Из вершины 0
-        (1, 3), (1, 5),  # Из вершины 1
-        (2, 3), (2, 6),  # Из вершины 2
-        (3, 7),  # Из вершины 3
-        (4, 5), (4, 6),  # Из вершины 4
-        (5, 7),  # Из вершины 5
-        (6, 7)   # Из вершины 6
-    ]
-
-    return vertices, edges
+    # Рёбра соединяют ближайшие вершины
+    return Mesh(vertices)
 
 
 def create_dodecahedron():
-    """Создаёт вершины и рёбра каркасного додекаэдра."""
+    """Создаёт каркасный додекаэдр."""
     phi = (1 + np.sqrt(5)) / 2  # Золотое сечение
 
     # Вершины додекаэдра
@@ -42,20 +151,61 @@ def create_dodecahedron():
         [-phi, 0, -1/phi], [phi, 0, -1/phi], [-phi, 0, 1/phi], [phi, 0, 1/phi]
     ])
 
-    # Рёбра додекаэдра (индексы вершин)
-    edges = [
-        (0, 8), (0, 12), (0, 16),  # Из вершины 0
-        (1, 8), (1, 13), (1, 17),  # Из вершины 1
-        (2, 10), (2, 14), (2, 16), # Из вершины 2
-        (3, 10), (3, 15), (3, 17), # Из вершины 3
-        (4, 9), (4, 12), (4, 18),  # Из вершины 4
-        (5, 9), (5, 13), (5, 19),  # Из вершины 5
-        (6, 11), (6, 14), (6, 18), # Из вершины 6
-        (7, 11), (7, 15), (7, 19), # Из вершины 7
-        (8, 10), (9, 11), (12, 13), (14, 15), (16, 18), (17, 19) # Рёбра между соседними вершинами
+    # Рёбра (длины 2 / phi) соединяют ближайшие вершины
+    return Mesh(vertices)
+
+
+def create_icosahedron():
+    """Создаёт икосаэдр с треугольными гранями, вписанный в единичную сферу."""
+    phi = (1 + np.sqrt(5)) / 2
+    vertices = np.array([
+        [-1, phi, 0], [1, phi, 0], [-1, -phi, 0], [1, -phi, 0],
+        [0, -1, phi], [0, 1, phi], [0, -1, -phi], [0, 1, -phi],
+        [phi, 0, -1], [phi, 0, 1], [-phi, 0, -1], [-phi, 0, 1],
+    ])
+    vertices /= np.linalg.norm(vertices, axis=1, keepdims=True)
+    triangles = [
+        (0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+        (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+        (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+        (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1),
     ]
+    return Mesh.from_triangles(vertices, triangles)
+
+
+def create_geodesic_sphere(subdivisions=3):
+    """
+    Геодезическая сфера: каждый треугольник икосаэдра subdivisions раз делится
+    на четыре, новые вершины проецируются на единичную сферу.
+    Число граней - 20 * 4^subdivisions.
+    """
+    mesh = create_icosahedron()
+    vertices = mesh.vertices
+    triangles = mesh.face_indices.reshape(-1, 3).astype(np.int64)
+    for _ in range(subdivisions):
+        # Середины рёбер: одна новая вершина на каждое уникальное ребро
+        pairs = np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]],
+                                        triangles[:, [2, 0]]]), axis=1)
+        edges, edge_of = np.unique(pairs, axis=0, return_inverse=True)
+        edge_of = edge_of.reshape(3, -1) + len(vertices)
+        midpoints = vertices[edges[:, 0]] + vertices[edges[:, 1]]
+        midpoints /= np.linalg.norm(midpoints, axis=1, keepdims=True)
+        vertices = np.concatenate([vertices, midpoints])
+
+        a, b, c = triangles.T
+        ab, bc, ca = edge_of
+        triangles = np.concatenate([
+            np.stack([a, ab, ca], axis=1), np.stack([ab, b, bc], axis=1),
+            np.stack([ca, bc, c], axis=1), np.stack([ab, bc, ca], axis=1),
+        ])
+    return Mesh.from_triangles(vertices, triangles)
+
 
-    return vertices, edges
+def create_lattice(nx, ny, nz, spacing=1.0):
+    """Кубическая решётка nx x ny x nz вершин; рёбра соединяют соседей на расстоянии spacing."""
+    x, y, z = np.meshgrid(np.arange(nx), np.arange(ny), np.arange(nz), indexing="ij")
+    vertices = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1) * float(spacing)
+    return Mesh(vertices, nearest_neighbour_edges(vertices, spacing))
 
 
 def plot_polyhedron(vertices, edges, ax, color="blue"):
@@ -72,21 +222,177 @@ def plot_polyhedron(vertices, edges, ax, color="blue"):
     ax.scatter(vertices[:, 0], vertices[:, 1], vertices[:, 2], color="red", s=10)
 
 
+def look_at(eye, target=(0, 0, 0), up=(0, 0, 1)):
+    """
+    Видовая матрица 4x4 камеры в точке eye, направленной на target.
+    Если направление взгляда параллельно up, вместо up берётся другая ось.
+    """
+    eye, target, up = (np.asarray(v, dtype=np.float64) for v in (eye, target, up))
+    forward = target - eye
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, up)
+    if np.linalg.norm(right) < 1e-9:
+        # Взгляд вдоль up: берём ось, наименее сонаправленную с направлением взгляда
+        right = np.cross(forward, np.eye(3)[np.argmin(np.abs(forward))])
+    right /= np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+    view = np.eye(4)
+    view[0, :3], view[1, :3], view[2, :3] = right, true_up, -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+    return view
+
+
+def perspective(fov_y=45, aspect=1.0, near=0.1, far=100.0):
+    """Матрица перспективной проекции 4x4 (угол обзора fov_y в градусах)."""
+    f = 1 / np.tan(np.radians(fov_y) / 2)
+    return np.array([
+        [f / aspect, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ])
+
+
+def orthographic(height=4.0, aspect=1.0, near=0.1, far=100.0):
+    """Матрица ортографической проекции 4x4; height - видимая высота сцены."""
+    return np.array([
+        [2 / (height * aspect), 0, 0, 0],
+        [0, 2 / height, 0, 0],
+        [0, 0, -2 / (far - near), -(far + near) / (far - near)],
+        [0, 0, 0, 1],
+    ])
+
+
+def _clip_segments(segments, width, height):
+    """
+    Отсекает отрезки (N, 4) прямоугольником [0, width - 1] x [0, height - 1]
+    (векторный алгоритм Лианга-Барски); полностью невидимые отрезки отбрасываются.
+    """
+    x1, y1, x2, y2 = segments.T
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = np.zeros(len(segments)), np.ones(len(segments))
+    keep = np.ones(len(segments), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x1), (dx, width - 1 - x1), (-dy, y1), (dy, height - 1 - y1)):
+            keep &= (p != 0) | (q >= 0)
+            ratio = q / p
+            t0 = np.where(p < 0, np.maximum(t0, ratio), t0)
+            t1 = np.where(p > 0, np.minimum(t1, ratio), t1)
+    keep &= t0 <= t1
+    t0, t1 = t0[keep, None], t1[keep, None]
+    start, delta = segments[keep, :2], segments[keep, 2:] - segments[keep, :2]
+    return np.hstack([start + delta * t0, start + delta * t1])
+
+
+def _draw_segments(buffer, segments, color):
+    """
+    Растеризует отрезки (N, 4) в пиксельных координатах в буфер одним векторным проходом.
+    Отрезки предварительно отсекаются границами буфера, поэтому число
+    растеризуемых точек не зависит от того, как далеко за экран уходят концы.
+    """
+    height, width = buffer.shape[:2]
+    segments = _clip_segments(segments, width, height)
+    x1, y1, x2, y2 = segments.T
+    steps = np.ceil(np.maximum(np.abs(x2 - x1), np.abs(y2 - y1))).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(segments)), steps)
+    t = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = t / np.maximum(steps - 1, 1)[segment]
+    x = np.rint(x1[segment] + (x2 - x1)[segment] * t).astype(np.int64)
+    y = np.rint(y1[segment] + (y2 - y1)[segment] * t).astype(np.int64)
+    visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    buffer[y[visible], x[visible]] = color
+
+
+def _homogeneous(vertices):
+    """Однородные координаты (N, 4) вершин (N, 3)."""
+    return np.hstack([vertices, np.ones((len(vertices), 1))])
+
+
+def render_wireframe(mesh, view, projection, size=(512, 512), buffer=None, color=255,
+                     homogeneous=None):
+    """
+    Рисует рёбра многогранника в массив uint8 (высота, ширина) без графического окна.
+    Все вершины проецируются одним умножением на матрицу projection @ view;
+    homogeneous - заранее вычисленные однородные координаты вершин (необязательно).
+    Рёбра отсекаются ближней плоскостью в пространстве отсечения (z >= -w),
+    а затем границами кадра.
+    """
+    width, height = size
+    if buffer is None:
+        buffer = np.zeros((height, width), dtype=np.uint8)
+    if homogeneous is None:
+        homogeneous = _homogeneous(mesh.vertices)
+    clip = homogeneous @ (projection @ view).T
+    start, end = clip[mesh.edges[:, 0]], clip[mesh.edges[:, 1]]
+
+    # Расстояние до ближней плоскости: d >= 0 - вершина перед ней
+    d0 = start[:, 2] + start[:, 3]
+    d1 = end[:, 2] + end[:, 3]
+    keep = (d0 >= 0) | (d1 >= 0)
+    start, end, d0, d1 = start[keep], end[keep], d0[keep], d1[keep]
+    t = (d0 / np.where(d0 != d1, d0 - d1, 1))[:, None]
+    crossing = start + (end - start) * t
+    start = np.where((d0 < 0)[:, None], crossing, start)
+    end = np.where((d1 < 0)[:, None], crossing, end)
+
+    # Нормализованные координаты [-1, 1] -> пиксели (ось y вниз)
+    points = np.concatenate([start, end])
+    px = (points[:, 0] / points[:, 3] + 1) * 0.5 * (width - 1)
+    py = (1 - points[:, 1] / points[:, 3]) * 0.5 * (height - 1)
+    count = len(start)
+    _draw_segments(buffer, np.stack([px[:count], py[:count], px[count:], py[count:]], axis=1),
+                   color)
+    return buffer
+
+
+def render_turntable(mesh, frames=360, distance=5.0, elevation=20.0, size=(512, 512),
+                     projection=None):
+    """
+    Генератор кадров облёта камеры вокруг многогранника (по кадру на угол).
+    Матрица проекции и однородные координаты вершин вычисляются один раз,
+    для каждого кадра меняется только видовая матрица.
+    """
+    width, height = size
+    if projection is None:
+        projection = perspective(45, width / height, 0.1, 10 * distance)
+    homogeneous = _homogeneous(mesh.vertices)
+    elevation = np.radians(elevation)
+    for angle in np.linspace(0, 2 * np.pi, frames, endpoint=False):
+        eye = distance * np.array([np.cos(elevation) * np.cos(angle),
+                                   np.cos(elevation) * np.sin(angle),
+                                   np.sin(elevation)])
+        yield render_wireframe(mesh, look_at(eye), projection, size, homogeneous=homogeneous)
+
+
+def save_frames(frames, directory, fmt="png"):
+    """Сохраняет кадры в каталог как frame_0000.png (или .npy); возвращает число кадров."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for count, frame in enumerate(frames, 1):
+        path = directory / f"frame_{count - 1:04d}.{fmt}"
+        if fmt == "npy":
+            np.save(path, frame)
+        else:
+            mpimg.imsave(path, frame, cmap="gray", vmin=0, vmax=255)
+    return count
+
+
 def main():
     # Создаём фигуру
     fig = plt.figure(figsize=(10, 5))
 
     # Добавляем график для куба
     ax_cube = fig.add_subplot(121, projection="3d")
-    vertices_cube, edges_cube = create_cube()
-    plot_polyhedron(vertices_cube, edges_cube, ax_cube, color="blue")
+    cube = create_cube()
+    plot_polyhedron(cube.vertices, cube.edges, ax_cube, color="blue")
     ax_cube.set_title("Куб")
     ax_cube.set_box_aspect([1, 1, 1])
 
     # Добавляем график для додекаэдра
     ax_dodecahedron = fig.add_subplot(122, projection="3d")
-    vertices_dodecahedron, edges_dodecahedron = create_dodecahedron()
-    plot_polyhedron(vertices_dodecahedron, edges_dodecahedron, ax_dodecahedron, color="green")
+    dodecahedron = create_dodecahedron()
+    plot_polyhedron(dodecahedron.vertices, dodecahedron.edges, ax_dodecahedron, color="green")
     ax_dodecahedron.set_title("Додекаэдр")
     ax_dodecahedron.set_box_aspect([1, 1, 1])
 
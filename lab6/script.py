@@ -1,4 +1,6 @@
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 # Кодовые области для алгоритма Коэна-Сазерленда
 INSIDE = 0  # Внутри окна
@@ -64,31 +66,220 @@ def cohen_sutherland_clip(x1, y1, x2, y2, x_min, x_max, y_min, y_max):
     else:
         return None
 
-def plot_clipping(lines, x_min, x_max, y_min, y_max):
-    """Отображение отсечённых отрезков."""
+def compute_out_codes(x, y, x_min, x_max, y_min, y_max):
+    """Вычисляет кодовые области для массивов точек."""
+    code = np.where(x < x_min, LEFT, np.where(x > x_max, RIGHT, INSIDE))
+    code |= np.where(y < y_min, BOTTOM, np.where(y > y_max, TOP, INSIDE))
+    return code
+
+def cohen_sutherland_clip_batch(segments, x_min, x_max, y_min, y_max):
+    """
+    Алгоритм Коэна-Сазерленда для массива отрезков (N, 4).
+    Тривиально принятые и отброшенные отрезки обрабатываются сразу для всех,
+    шаги отсечения повторяются только для оставшихся.
+    Возвращает массив (N, 4) отсечённых координат и булеву маску keep;
+    для принятых отрезков результат совпадает с cohen_sutherland_clip.
+    """
+    clipped = np.array(segments, dtype=np.float64).reshape(-1, 4)
+    x1, y1, x2, y2 = clipped.T
+    out_code1 = compute_out_codes(x1, y1, x_min, x_max, y_min, y_max)
+    out_code2 = compute_out_codes(x2, y2, x_min, x_max, y_min, y_max)
+    keep = np.zeros(len(clipped), dtype=bool)
+    active = np.arange(len(clipped))
+
+    while len(active):
+        code1, code2 = out_code1[active], out_code2[active]
+        # Оба конца внутри окна
+        accepted = (code1 | code2) == 0
+        keep[active[accepted]] = True
+        # Оба конца снаружи окна в одном регионе
+        rejected = (code1 & code2) != 0
+        remaining = ~(accepted | rejected)
+        active = active[remaining]
+        if not len(active):
+            break
+
+        # Отсечь часть отрезка для оставшихся
+        code1, code2 = code1[remaining], code2[remaining]
+        first = code1 != 0
+        out_code_out = np.where(first, code1, code2)
+        ax1, ay1, ax2, ay2 = x1[active], y1[active], x2[active], y2[active]
+        x = np.zeros(len(active))
+        y = np.zeros(len(active))
+
+        top = (out_code_out & TOP) != 0
+        bottom = ~top & ((out_code_out & BOTTOM) != 0)
+        right = ~top & ~bottom & ((out_code_out & RIGHT) != 0)
+        left = ~top & ~bottom & ~right & ((out_code_out & LEFT) != 0)
+        for mask, bound in ((top, y_max), (bottom, y_min)):
+            x[mask] = ax1[mask] + (ax2[mask] - ax1[mask]) * (bound - ay1[mask]) / (ay2[mask] - ay1[mask])
+            y[mask] = bound
+        for mask, bound in ((right, x_max), (left, x_min)):
+            y[mask] = ay1[mask] + (ay2[mask] - ay1[mask]) * (bound - ax1[mask]) / (ax2[mask] - ax1[mask])
+            x[mask] = bound
+
+        moved1, moved2 = active[first], active[~first]
+        x1[moved1], y1[moved1] = x[first], y[first]
+        x2[moved2], y2[moved2] = x[~first], y[~first]
+        out_code1[moved1] = compute_out_codes(x[first], y[first], x_min, x_max, y_min, y_max)
+        out_code2[moved2] = compute_out_codes(x[~first], y[~first], x_min, x_max, y_min, y_max)
+
+    clipped[:, 0], clipped[:, 1], clipped[:, 2], clipped[:, 3] = x1, y1, x2, y2
+    return clipped, keep
+
+class SegmentGrid:
+    """
+    Пространственный индекс отрезков: равномерная сетка по их ограничивающим
+    прямоугольникам. Список отрезков каждой ячейки хранится в плоском виде
+    (cell_offsets + cell_segments). Отрезки, покрывающие слишком много ячеек,
+    хранятся отдельно и проверяются при каждом запросе.
+    Число ячеек ограничено max(MAX_CELLS_PER_SEGMENT * N, MIN_CELL_LIMIT):
+    при слишком мелком cell_size ячейки укрупняются.
+    """
+
+    MAX_CELLS_PER_SEGMENT = 16
+    MIN_CELL_LIMIT = 1024
+
+    def __init__(self, segments, cell_size=None, max_cells_per_segment=64):
+        self.segments = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+        x_low, x_high, y_low, y_high = self._bounds(self.segments)
+        self.origin = np.array([x_low.min(), y_low.min()]) if len(self.segments) else np.zeros(2)
+        extent = (np.array([x_high.max(), y_high.max()]) - self.origin) if len(self.segments) else np.ones(2)
+        count = max(len(self.segments), 1)
+        if cell_size is None:
+            longest = extent.max()
+            if extent.min() > 1e-9 * longest:
+                # Около четырёх отрезков на ячейку при равномерном распределении
+                cell_size = np.sqrt(extent[0] * extent[1] * 4 / count)
+            else:
+                # Отрезки вдоль одной прямой (или в одной точке): та же плотность по длине
+                cell_size = longest * 4 / count if longest > 0 else 1.0
+        self.cell_size = float(max(cell_size, 1e-12))
+        limit = max(self.MAX_CELLS_PER_SEGMENT * count, self.MIN_CELL_LIMIT)
+        while np.prod([int(n) + 1 for n in extent // self.cell_size]) > limit:
+            self.cell_size *= 2
+        self.shape = tuple(int(n) + 1 for n in np.floor(extent / self.cell_size))
+
+        (ix0, iy0), (ix1, iy1) = self._cells(x_low, y_low), self._cells(x_high, y_high)
+        widths, heights = ix1 - ix0 + 1, iy1 - iy0 + 1
+        counts = widths * heights
+        small = counts <= max_cells_per_segment
+        self.large = np.flatnonzero(~small)
+
+        # Каждый небольшой отрезок записывается во все ячейки своего прямоугольника
+        ids = np.flatnonzero(small)
+        counts = counts[ids]
+        segment = np.repeat(ids, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        height = heights[segment]
+        cell = (ix0[segment] + local // height) * self.shape[1] + iy0[segment] + local % height
+        order = np.argsort(cell, kind="stable")
+        self.cell_segments = segment[order]
+        self.cell_offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell, minlength=self.shape[0] * self.shape[1]), out=self.cell_offsets[1:])
+
+    @staticmethod
+    def _bounds(segments):
+        """Ограничивающие прямоугольники отрезков: x_low, x_high, y_low, y_high."""
+        x1, y1, x2, y2 = segments.T
+        return np.minimum(x1, x2), np.maximum(x1, x2), np.minimum(y1, y2), np.maximum(y1, y2)
+
+    def _cells(self, x, y):
+        """Индексы ячеек сетки для координат (с ограничением по границам сетки)."""
+        ix = np.clip(np.floor((x - self.origin[0]) / self.cell_size), 0, self.shape[0] - 1)
+        iy = np.clip(np.floor((y - self.origin[1]) / self.cell_size), 0, self.shape[1] - 1)
+        return ix.astype(np.int64), iy.astype(np.int64)
+
+    def candidates(self, x_min, x_max, y_min, y_max):
+        """Номера отрезков, ограничивающий прямоугольник которых пересекает окно."""
+        (ix0, iy0), (ix1, iy1) = self._cells(x_min, y_min), self._cells(x_max, y_max)
+        parts = [self.large]
+        for ix in range(int(ix0), int(ix1) + 1):
+            first = ix * self.shape[1] + int(iy0)
+            last = ix * self.shape[1] + int(iy1)
+            parts.append(self.cell_segments[self.cell_offsets[first]:self.cell_offsets[last + 1]])
+        ids = np.unique(np.concatenate(parts))
+        x_low, x_high, y_low, y_high = self._bounds(self.segments[ids])
+        overlap = (x_high >= x_min) & (x_low <= x_max) & (y_high >= y_min) & (y_low <= y_max)
+        return ids[overlap]
+
+    def query(self, x_min, x_max, y_min, y_max):
+        """
+        Отсечение окном только отрезков-кандидатов.
+        Возвращает номера видимых отрезков и их отсечённые координаты (K, 4).
+        """
+        ids = self.candidates(x_min, x_max, y_min, y_max)
+        clipped, keep = cohen_sutherland_clip_batch(self.segments[ids], x_min, x_max, y_min, y_max)
+        return ids[keep], clipped[keep]
+
+    @staticmethod
+    def _npz_path(path):
+        """Путь с расширением .npz (np.savez добавляет его сам, np.load - нет)."""
+        path = str(path)
+        return path if path.endswith(".npz") else path + ".npz"
+
+    def save(self, path):
+        """Сохраняет индекс в файл .npz (расширение добавляется при отсутствии)."""
+        np.savez(self._npz_path(path), segments=self.segments, origin=self.origin, cell_size=self.cell_size,
+                 shape=self.shape, large=self.large, cell_segments=self.cell_segments,
+                 cell_offsets=self.cell_offsets)
+
+    @classmethod
+    def load(cls, path):
+        """Загружает индекс, сохранённый методом save, без повторного построения."""
+        data = np.load(cls._npz_path(path))
+        grid = cls.__new__(cls)
+        grid.segments = data["segments"]
+        grid.origin = data["origin"]
+        grid.cell_size = float(data["cell_size"])
+        grid.shape = tuple(int(n) for n in data["shape"])
+        grid.large = data["large"]
+        grid.cell_segments = data["cell_segments"]
+        grid.cell_offsets = data["cell_offsets"]
+        return grid
+
+def _visible_segments(segments, ax, min_pixels):
+    """Отбрасывает отрезки короче min_pixels пикселей при текущем масштабе осей."""
+    x_low, x_high = ax.get_xlim()
+    y_low, y_high = ax.get_ylim()
+    box = ax.get_window_extent()
+    scale = np.array([box.width / (x_high - x_low), box.height / (y_high - y_low)])
+    lengths = np.hypot((segments[:, 2] - segments[:, 0]) * scale[0],
+                       (segments[:, 3] - segments[:, 1]) * scale[1])
+    return segments[lengths >= min_pixels]
+
+def plot_clipping(lines, x_min, x_max, y_min, y_max, decimate=False, min_pixels=1.0):
+    """
+    Отображение отсечённых отрезков.
+    Исходные и отсечённые отрезки рисуются двумя коллекциями LineCollection.
+    - decimate: не рисовать отрезки короче min_pixels пикселей при текущем масштабе.
+    """
     fig, ax = plt.subplots()
+    segments = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
 
     # Рисуем окно
     ax.plot([x_min, x_max, x_max, x_min, x_min], 
             [y_min, y_min, y_max, y_max, y_min], 'r-', label='Окно')
 
-    # Рисуем исходные отрезки
-    for line in lines:
-        x1, y1, x2, y2 = line
-        ax.plot([x1, x2], [y1, y2], 'b--', label='Исходный отрезок' if line == lines[0] else "")
-
-    # Отсекаем и рисуем отсечённые отрезки
-    for line in lines:
-        x1, y1, x2, y2 = line
-        clipped_line = cohen_sutherland_clip(x1, y1, x2, y2, x_min, x_max, y_min, y_max)
-        if clipped_line:
-            (cx1, cy1), (cx2, cy2) = clipped_line
-            ax.plot([cx1, cx2], [cy1, cy2], 'g-', label='Отсечённый отрезок' if line == lines[0] else "")
-
-    ax.legend()
     ax.set_xlim(min(x_min, -10), max(x_max, 10))
     ax.set_ylim(min(y_min, -10), max(y_max, 10))
     ax.set_aspect('equal', adjustable='box')
+
+    # Отсекаем все отрезки разом
+    clipped, keep = cohen_sutherland_clip_batch(segments, x_min, x_max, y_min, y_max)
+    clipped = clipped[keep]
+    if decimate:
+        fig.canvas.draw()
+        segments = _visible_segments(segments, ax, min_pixels)
+        clipped = _visible_segments(clipped, ax, min_pixels)
+
+    # Рисуем исходные и отсечённые отрезки
+    ax.add_collection(LineCollection(segments.reshape(-1, 2, 2), colors='b',
+                                     linestyles='--', label='Исходный отрезок'))
+    ax.add_collection(LineCollection(clipped.reshape(-1, 2, 2), colors='g',
+                                     label='Отсечённый отрезок'))
+
+    ax.legend()
     ax.grid(True)
     plt.show()
 
@@ -1,3 +1,6 @@
+import math
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image, ImageDraw
@@ -23,6 +26,74 @@ def scale_and_rotate_image(image, size, target_width, target_height, rotation_an
 
     return new_image
 
+def _rotation_matrix(size, angle):
+    """
+    Матрица поворота с расширением холста, как в Image.rotate(angle, expand=True):
+    коэффициенты (a, b, c, d, e, f) переводят координаты повёрнутого изображения
+    в координаты исходного. Возвращает матрицу 3x3 и размер повёрнутого изображения.
+    """
+    width, height = size
+    angle = -math.radians(angle % 360.0)
+    a, b = round(math.cos(angle), 15), round(math.sin(angle), 15)
+    d, e = -b, a
+    cx, cy = width / 2.0, height / 2.0
+    c = a * -cx + b * -cy + cx
+    f = d * -cx + e * -cy + cy
+
+    xx, yy = [], []
+    for x, y in ((0, 0), (width, 0), (width, height), (0, height)):
+        xx.append(a * x + b * y + c)
+        yy.append(d * x + e * y + f)
+    new_width = math.ceil(max(xx)) - math.floor(min(xx))
+    new_height = math.ceil(max(yy)) - math.floor(min(yy))
+    shift_x, shift_y = -(new_width - width) / 2.0, -(new_height - height) / 2.0
+    c, f = a * shift_x + b * shift_y + c, d * shift_x + e * shift_y + f
+    return np.array([[a, b, c], [d, e, f], [0, 0, 1]]), (new_width, new_height)
+
+# Кэш повёрнутых спрайтов scale_and_rotate_fused: ключ -> спрайт размера повёрнутого прямоугольника
+_sprite_cache = OrderedDict()
+SPRITE_CACHE_SIZE = 256
+
+def scale_and_rotate_fused(image, size, target_width, target_height, rotation_angle=45,
+                           resample=Image.Resampling.BICUBIC, cache_key=None):
+    """
+    То же, что scale_and_rotate_image, но за одну передискретизацию: масштабирование
+    и поворот сводятся в одну аффинную матрицу, и исходное изображение выбирается
+    сразу в пиксели повёрнутого спрайта, который затем накладывается на белый холст.
+    - cache_key: если задан, спрайт кэшируется (LRU) по этому ключу и параметрам;
+      вызывающий код отвечает за смену ключа при изменении изображения.
+    """
+    key = (cache_key, target_width, target_height, rotation_angle, resample)
+    sprite = _sprite_cache.get(key) if cache_key is not None else None
+    if sprite is not None:
+        _sprite_cache.move_to_end(key)
+    else:
+        rotation, rotated_size = _rotation_matrix((target_width, target_height), rotation_angle)
+        # Спрайт -> масштабированное изображение -> исходное
+        to_source = np.diag([image.width / target_width, image.height / target_height, 1])
+        matrix = to_source @ rotation
+        source = image if image.mode == "RGBA" else image.convert("RGBA")
+        sprite = source.transform(rotated_size, Image.Transform.AFFINE,
+                                  tuple(matrix[:2].ravel()), resample=resample,
+                                  fillcolor=(255, 255, 255, 0))
+        if cache_key is not None:
+            _sprite_cache[key] = sprite
+            if len(_sprite_cache) > SPRITE_CACHE_SIZE:
+                _sprite_cache.popitem(last=False)
+
+    width, height = size
+    cx, cy = width // 2, height // 2  # Центр изображения
+    rotated_width, rotated_height = sprite.size
+    x, y = cx - rotated_width // 2, cy - rotated_height // 4
+
+    # Пиксели с прозрачностью спрайта смешиваются с белым фоном;
+    # часть спрайта за границей холста отбрасывается
+    result = Image.new("RGBA", size, "white")
+    left, top = max(-x, 0), max(-y, 0)
+    if left < rotated_width and top < rotated_height and x < width and y < height:
+        result.alpha_composite(sprite, dest=(x + left, y + top), source=(left, top))
+    return result
+
 def draw_axes(image, color="black"):
     """Рисует оси координат на изображении."""
     draw = ImageDraw.Draw(image)
@@ -34,18 +105,108 @@ def draw_axes(image, color="black"):
     # Вертикальная ось
     draw.line([(cx, 0), (cx, height)], fill=color, width=2)
 
+# Смещение пробной точки от середины интервала (доля интервала)
+PROBE_OFFSET = (math.sqrt(5) - 2) / 8
+
+def sample_function(func, x_range, y_range, size, tolerance=0.25, initial_samples=None,
+                    max_depth=16):
+    """
+    Адаптивная выборка векторизованной функции y = func(x) для вывода на холст size.
+    Интервал делится, пока пробная точка отклоняется от хорды более чем на
+    tolerance пикселей и интервал шире пикселя; все интервалы одного уровня
+    обрабатываются одним вызовом func. Возвращает массив (K, 2) пиксельных координат.
+    - initial_samples: число начальных интервалов (по умолчанию - ширина / 4, не меньше 64).
+    Пробная точка смещена от середины на иррациональную долю интервала, чтобы
+    периодическая функция с периодом, кратным шагу сетки, не выглядела прямой.
+    """
+    width, height = size
+    x_min, x_max = x_range
+    y_min, y_max = y_range
+    if initial_samples is None:
+        initial_samples = max(64, width // 4)
+
+    def to_pixels(x, y):
+        return ((x - x_min) / (x_max - x_min) * width,
+                (y_max - y) / (y_max - y_min) * height)
+
+    x = np.linspace(x_min, x_max, initial_samples + 1)
+    px, py = to_pixels(x, func(x))
+    refine = np.ones(initial_samples, dtype=bool)
+    for depth in range(max_depth):
+        # Делим только широкие интервалы, отмеченные на прошлом уровне
+        refine &= np.abs(np.diff(px)) > 1
+        candidates = np.flatnonzero(refine)
+        if not len(candidates):
+            break
+        # Смещение меняет знак по уровням, чтобы интервалы сужались равномерно
+        t = 0.5 + (-1) ** depth * PROBE_OFFSET
+        mid_x = x[candidates] + (x[candidates + 1] - x[candidates]) * t
+        mid_px, mid_py = to_pixels(mid_x, func(mid_x))
+        chord_py = py[candidates] + (py[candidates + 1] - py[candidates]) * t
+        error = np.abs(mid_py - chord_py)
+        split = ~(error <= tolerance)  # NaN тоже требует уточнения
+        split_at = candidates[split]
+
+        x = np.insert(x, split_at + 1, mid_x[split])
+        px = np.insert(px, split_at + 1, mid_px[split])
+        py = np.insert(py, split_at + 1, mid_py[split])
+        # Обе части разделённого интервала проверяются на следующем уровне
+        refine = np.zeros(len(x) - 1, dtype=bool)
+        halves = split_at + np.arange(len(split_at))
+        refine[halves] = True
+        refine[halves + 1] = True
+    return np.stack([px, py], axis=1)
+
+def _draw_polyline(buffer, points, color):
+    """Растеризует ломаную (K, 2) в 2-D или 3-D массив; сегменты с NaN пропускаются."""
+    height, width = buffer.shape[:2]
+    start, end = points[:-1], points[1:]
+    finite = np.isfinite(start).all(axis=1) & np.isfinite(end).all(axis=1)
+    start, end = start[finite], end[finite]
+    steps = np.ceil(np.abs(end - start).max(axis=1, initial=0)).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(start)), steps)
+    t = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = (t / np.maximum(steps - 1, 1)[segment])[:, None]
+    pixels = np.rint(start[segment] + (end - start)[segment] * t).astype(np.int64)
+    x, y = pixels[:, 0], pixels[:, 1]
+    visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    buffer[y[visible], x[visible]] = color
+
+def plot_function(image, func, x_range, y_range, color="red", width=2, tolerance=0.25):
+    """
+    Рисует график векторизованной функции func на изображении PIL или массиве NumPy.
+    - x_range, y_range: видимые диапазоны значений по осям.
+    Для изображения PIL ломаная рисуется ImageDraw прямо в буфер изображения,
+    для массива - растеризуется в него напрямую (толщина 1 пиксель).
+    Возвращает число точек выборки.
+    """
+    if isinstance(image, np.ndarray):
+        size = (image.shape[1], image.shape[0])
+    else:
+        size = image.size
+    points = sample_function(func, x_range, y_range, size, tolerance)
+
+    if isinstance(image, np.ndarray):
+        _draw_polyline(image, points, color)
+        return len(points)
+
+    draw = ImageDraw.Draw(image)
+    # Непрерывные участки без NaN рисуются отдельными ломаными
+    finite = np.isfinite(points).all(axis=1)
+    breaks = np.flatnonzero(np.diff(finite.astype(np.int8))) + 1
+    for run in np.split(np.arange(len(points)), breaks):
+        if len(run) > 1 and finite[run[0]]:
+            draw.line(points[run].ravel().tolist(), fill=color, width=width)
+    return len(points)
+
 def draw_cosine_function(image, color="red"):
     """Рисует график cos(x) на изображении."""
-    draw = ImageDraw.Draw(image)
     width, height = image.size
 
-    # Генерируем точки для графика
-    x_values = np.linspace(0, width, 1000)
-    y_values = height // 2 - (np.cos((x_values / width) * 4 * np.pi) * (height // 4))  # Масштабирование cos(x)
-
-    # Соединяем точки
-    points = [(x, y) for x, y in zip(x_values, y_values)]
-    draw.line(points, fill=color, width=2)
+    # Один период косинуса - половина ширины, амплитуда - четверть высоты
+    y_scale = height // 4
+    y_range = ((height // 2 - height) / y_scale, (height // 2) / y_scale)
+    plot_function(image, np.cos, (0, 4 * np.pi), y_range, color=color)
 
 def main():
     # Размер итогового изображения
@@ -14,7 +14,7 @@ def intersect(s, p, edge_start, edge_end):
     if det == 0:
         return None  # Отрезки параллельны
 
-    t = ((s[0] - edge_start[0]) * dy2 - (s[1] - edge_start[1]) * dx2) / det
+    t = ((edge_start[0] - s[0]) * dy2 - (edge_start[1] - s[1]) * dx2) / det
     return s[0] + t * dx1, s[1] + t * dy1
 
 def sutherland_hodgman(subject_polygon, clip_polygon):
@@ -40,6 +40,164 @@ def sutherland_hodgman(subject_polygon, clip_polygon):
 
     return output_list
 
+def clip_edges(clip_polygon):
+    """
+    Коэффициенты полуплоскостей выпуклого отсекателя: для каждого ребра -
+    начало (x, y) и направление (dx, dy). Вычисляются один раз на окно.
+    """
+    start = np.asarray(clip_polygon, dtype=np.float64)
+    direction = np.roll(start, -1, axis=0) - start
+    return np.hstack([start, direction])
+
+def _inside_edge(x, y, edge):
+    """Векторная версия inside(): точки по внутреннюю сторону ребра (или на нём)."""
+    sx, sy, dx, dy = edge
+    return dx * (y - sy) - dy * (x - sx) >= 0
+
+def sutherland_hodgman_batch(coords, offsets, clip_polygon):
+    """
+    Отсечение множества многоугольников одним выпуклым окном.
+    - coords: массив вершин (M, 2) всех многоугольников подряд;
+    - offsets: массив (P + 1,), вершины многоугольника i - coords[offsets[i]:offsets[i + 1]].
+    Многоугольники, ограничивающий прямоугольник которых целиком внутри окна
+    или целиком снаружи одного из рёбер, не обрабатываются по рёбрам.
+    Для остальных все вершины классифицируются относительно ребра разом.
+    Возвращает отсечённые многоугольники в том же формате (coords, offsets);
+    непустые результаты совпадают с sutherland_hodgman.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    edges = clip_edges(clip_polygon)
+    sizes = np.diff(offsets)
+    polygon = np.repeat(np.arange(len(sizes)), sizes)
+
+    # Быстрая проверка по углам ограничивающих прямоугольников
+    low = np.full((len(sizes), 2), np.inf)
+    high = np.full((len(sizes), 2), -np.inf)
+    np.minimum.at(low, polygon, coords)
+    np.maximum.at(high, polygon, coords)
+    corners = [(low[:, 0], low[:, 1]), (high[:, 0], low[:, 1]),
+               (high[:, 0], high[:, 1]), (low[:, 0], high[:, 1])]
+    fully_inside = sizes > 0
+    fully_outside = sizes == 0
+    for edge in edges:
+        corner_inside = np.array([_inside_edge(x, y, edge) for x, y in corners])
+        fully_inside &= corner_inside.all(axis=0)
+        fully_outside |= ~corner_inside.any(axis=0)
+    fully_inside &= ~fully_outside
+
+    # По рёбрам обрабатываются только пересекающие окно многоугольники
+    work = np.flatnonzero(~fully_inside & ~fully_outside)
+    selected = np.isin(polygon, work)
+    points = coords[selected]
+    owner = np.searchsorted(work, polygon[selected])  # Номер многоугольника среди work
+
+    for edge in edges:
+        # Предыдущая вершина s для каждой вершины p (циклически в своём многоугольнике)
+        counts = np.bincount(owner, minlength=len(work))
+        ends = np.cumsum(counts)
+        position = np.arange(len(points))
+        is_first = position == (ends - counts)[owner]
+        previous = np.where(is_first, ends[owner] - 1, position - 1)
+        inside_p = _inside_edge(points[:, 0], points[:, 1], edge)
+        inside_s = inside_p[previous]
+
+        # Для каждой вершины: точка пересечения (если сторона сменилась), затем p (если внутри)
+        crossing = inside_p != inside_s
+        s = points[previous[crossing]]
+        p = points[crossing]
+        sx, sy, dx2, dy2 = edge
+        dx1, dy1 = p[:, 0] - s[:, 0], p[:, 1] - s[:, 1]
+        det = dx1 * dy2 - dy1 * dx2
+        t = ((sx - s[:, 0]) * dy2 - (sy - s[:, 1]) * dx2) / det
+
+        emitted = crossing.astype(np.int64) + inside_p
+        output_end = np.cumsum(emitted)
+        result = np.empty((output_end[-1] if len(output_end) else 0, 2))
+        result[(output_end - emitted)[crossing]] = np.stack([s[:, 0] + t * dx1, s[:, 1] + t * dy1], axis=1)
+        result[output_end[inside_p] - 1] = points[inside_p]
+        owner = np.repeat(owner, emitted)
+        points = result
+
+    # Сборка результата в исходном порядке многоугольников
+    unchanged = np.isin(polygon, np.flatnonzero(fully_inside))
+    result_owner = np.concatenate([polygon[unchanged], work[owner]])
+    order = np.argsort(result_owner, kind="stable")
+    result = np.concatenate([coords[unchanged], points])[order]
+    result_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(result_owner, minlength=len(sizes)), out=result_offsets[1:])
+    return result, result_offsets
+
+def _fill_polygon(mask, points, value, rule):
+    """
+    Заполняет один многоугольник методом сканирующих строк с таблицей рёбер.
+    Пиксель (x, y) закрашивается, если его центр (x + 0.5, y + 0.5) внутри.
+    """
+    height, width = mask.shape[:2]
+    start = points
+    end = np.roll(points, -1, axis=0)
+    # Горизонтальные рёбра не пересекают центры строк
+    sloped = start[:, 1] != end[:, 1]
+    start, end = start[sloped], end[sloped]
+    if not len(start):
+        return
+
+    # Таблица рёбер: верхний конец, наклон dx/dy, направление обхода и диапазон строк
+    direction = np.where(end[:, 1] > start[:, 1], 1, -1)
+    top = np.where((direction > 0)[:, None], start, end)
+    bottom = np.where((direction > 0)[:, None], end, start)
+    slope = (bottom[:, 0] - top[:, 0]) / (bottom[:, 1] - top[:, 1])
+    first_row = np.ceil(top[:, 1] - 0.5).astype(np.int64)
+    last_row = np.ceil(bottom[:, 1] - 0.5).astype(np.int64) - 1
+    order = np.argsort(first_row, kind="stable")
+    first_row = first_row[order]
+
+    active = np.zeros(0, dtype=np.int64)
+    next_edge = 0
+    for row in range(max(first_row[0], 0), min(last_row.max(), height - 1) + 1):
+        # Добавляем рёбра, начинающиеся не ниже строки, и убираем закончившиеся
+        added = np.searchsorted(first_row, row, side="right")
+        active = np.concatenate([active, order[next_edge:added]])
+        next_edge = added
+        active = active[last_row[active] >= row]
+        if not len(active):
+            continue
+
+        xs = top[active, 0] + (row + 0.5 - top[active, 1]) * slope[active]
+        sorting = np.argsort(xs, kind="stable")
+        xs = xs[sorting]
+        if rule == "evenodd":
+            left, right = xs[0::2], xs[1::2]
+        else:
+            winding = np.cumsum(direction[active][sorting])
+            inside = np.flatnonzero(winding[:-1] != 0)
+            left, right = xs[inside], xs[inside + 1]
+
+        columns_left = np.clip(np.ceil(left - 0.5), 0, width).astype(np.int64)
+        columns_right = np.clip(np.ceil(right - 0.5), 0, width).astype(np.int64)
+        for a, b in zip(columns_left.tolist(), columns_right.tolist()):
+            if a < b:
+                mask[row, a:b] = value
+
+def fill_polygons(mask, coords, offsets, values=255, rule="evenodd"):
+    """
+    Растеризует многоугольники в маску или изображение меток (2-D массив NumPy).
+    - coords, offsets: многоугольники в плоском виде, как у sutherland_hodgman_batch;
+    - values: значение для всех многоугольников или массив значений (меток) по одному
+      на многоугольник;
+    - rule: правило заполнения - "evenodd" (чёт-нечет) или "nonzero" (ненулевой обход).
+    Каждый отрезок строки записывается одним срезом.
+    """
+    if rule not in ("evenodd", "nonzero"):
+        raise ValueError(f"Неизвестное правило заполнения: {rule}")
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.broadcast_to(values, (len(offsets) - 1,))
+    for i in range(len(offsets) - 1):
+        if offsets[i + 1] - offsets[i] >= 3:
+            _fill_polygon(mask, coords[offsets[i]:offsets[i + 1]], values[i], rule)
+    return mask
+
 def draw_polygon(polygon, color='blue', linestyle='-', fill=False):
     """Рисует многоугольник."""
     if len(polygon) > 0:
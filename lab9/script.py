@@ -1,45 +1,317 @@
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import cv2
 import numpy as np
 from matplotlib import pyplot as plt
 
-def apply_low_pass_filter(image, radius):
-    """Применяет фильтр низких частот: размытие за пределами круга радиуса R."""
+def filter_region(image, selected, filter_func, halo, tile_size=64, out=None):
+    """
+    Применяет фильтр только там, где selected истинна.
+    Изображение делится на плитки tile_size x tile_size; соседние плитки строки,
+    содержащие выбранные пиксели, объединяются в полосу, которая фильтруется
+    с запасом halo пикселей (радиус ядра) и переносится в результат одним
+    copyto по маске. Результат совпадает с фильтрацией всего изображения.
+    - out: массив результата (например, переиспользуемый буфер); out=image -
+      обработка на месте: полоса строк плиток вместе с запасом halo копируется
+      до записи, так что фильтр всегда читает исходные пиксели.
+    """
+    in_place = out is image
+    if out is None:
+        out = image.copy()
+    elif not in_place:
+        np.copyto(out, image)
+    height, width = selected.shape
+    rows = -(-height // tile_size)
+    columns = -(-width // tile_size)
+
+    # Какие плитки содержат выбранные пиксели
+    padded = np.zeros((rows * tile_size, columns * tile_size), dtype=bool)
+    padded[:height, :width] = selected
+    tiles = padded.reshape(rows, tile_size, columns, tile_size).any(axis=(1, 3))
+
+    source, offset, carry = image, 0, None
+    for row in range(rows):
+        y0, y1 = row * tile_size, min((row + 1) * tile_size, height)
+        # Полоса с запасом halo, обрезанным по границам изображения
+        hy0, hy1 = max(y0 - halo, 0), min(y1 + halo, height)
+        if in_place:
+            # Верхний запас уже перезаписан предыдущей строкой плиток -
+            # берём его исходные значения, сохранённые до записи
+            source, offset = image[hy0:hy1].copy(), hy0
+            if carry is not None:
+                source[:len(carry)] = carry
+            carry = source[max(y1 - halo, 0) - hy0:y1 - hy0].copy()
+
+        # Непрерывные отрезки выбранных плиток в строке
+        flags = np.concatenate([[False], tiles[row], [False]])
+        changes = np.flatnonzero(flags[1:] != flags[:-1])
+        for first, last in zip(changes[0::2], changes[1::2]):
+            x0, x1 = first * tile_size, min(last * tile_size, width)
+            hx0, hx1 = max(x0 - halo, 0), min(x1 + halo, width)
+            filtered = filter_func(source[hy0 - offset:hy1 - offset, hx0:hx1])
+            core = filtered[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+            where = selected[y0:y1, x0:x1]
+            if core.ndim == 3:
+                where = where[..., None]
+            np.copyto(out[y0:y1, x0:x1], core, where=where)
+    return out
+
+# Ядро повышения резкости
+SHARPEN_KERNEL = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]], dtype=np.float32)
+
+@lru_cache(maxsize=8)
+def _outside_circle(shape, radius):
+    """Маска пикселей вне круга радиуса radius в центре; строится один раз на размер кадра."""
     # Создаем маску: область внутри круга - 1, за пределами - 0
-    rows, cols = image.shape[:2]
+    rows, cols = shape
     center = (cols // 2, rows // 2)
     mask = np.zeros((rows, cols), dtype=np.uint8)
     cv2.circle(mask, center, radius, 255, -1)
+    outside = mask == 0
+    outside.setflags(write=False)
+    return outside
 
-    # Применяем Гауссово размытие
-    blurred = cv2.GaussianBlur(image, (15, 15), 0)
-
-    # Комбинируем: область вне круга - размытая, внутри - оригинал
-    result = np.copy(image)
-    result[mask == 0] = blurred[mask == 0]
-
-    return result
+def apply_low_pass_filter(image, radius, out=None):
+    """Применяет фильтр низких частот: размытие за пределами круга радиуса R."""
+    # Размываем только область вне круга (плитки с запасом в радиус ядра),
+    # внутри круга остаётся оригинал
+    return filter_region(image, _outside_circle(image.shape[:2], radius),
+                         lambda block: cv2.GaussianBlur(block, (15, 15), 0), 7, out=out)
 
-def apply_high_pass_filter(image, threshold):
+def apply_high_pass_filter(image, threshold, out=None):
     """Применяет фильтр высоких частот: повышает резкость в районе пикселей с яркостью > T."""
     # Преобразуем изображение в оттенки серого
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    # Находим области с яркостью выше порога
-    mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)[1]
+    # Повышаем резкость только для пикселей с яркостью > T, остальное оставляем оригинальным
+    return filter_region(image, gray > threshold,
+                         lambda block: cv2.filter2D(block, -1, SHARPEN_KERNEL), 1, out=out)
+
+@lru_cache(maxsize=32)
+def radial_mask(shape, kind, radius, profile="gaussian", order=2):
+    """
+    Радиальная маска частот для спектра rfft2 изображения формы shape (высота, ширина).
+    - kind: "low", "high" или "band"; для "band" radius - пара (нижняя, верхняя) частоты;
+    - radius: частота среза в единицах спектра (число периодов на изображение);
+    - profile: "ideal" (резкий срез), "gaussian" или "butterworth" (порядка order).
+    Маски кэшируются по (shape, kind, radius, profile).
+    """
+    height, width = shape
+    fy = np.fft.fftfreq(height) * height
+    fx = np.fft.rfftfreq(width) * width
+    distance = np.hypot(fy[:, None], fx[None, :]).astype(np.float32)
+
+    def low(cutoff):
+        if profile == "ideal":
+            return (distance <= cutoff).astype(np.float32)
+        if profile == "gaussian":
+            return np.exp(-(distance ** 2) / (2 * max(cutoff, 1e-6) ** 2))
+        if profile == "butterworth":
+            return 1 / (1 + (distance / max(cutoff, 1e-6)) ** (2 * order))
+        raise ValueError(f"Неизвестный профиль фильтра: {profile}")
+
+    if kind == "low":
+        mask = low(radius)
+    elif kind == "high":
+        mask = 1 - low(radius)
+    elif kind == "band":
+        mask = low(radius[1]) * (1 - low(radius[0]))
+    else:
+        raise ValueError(f"Неизвестный тип фильтра: {kind}")
+    mask = mask.astype(np.float32)
+    mask.setflags(write=False)
+    return mask
+
+class FrequencyFilter:
+    """
+    Частотная фильтрация изображения: спектр (rfft2 по каждому каналу)
+    вычисляется один раз, после чего любой фильтр - это умножение на маску
+    и одно обратное преобразование. Размер дополняется отражением до длин,
+    удобных для БПФ.
+    """
 
-    # Применяем фильтр резкости (ядро повышения резкости)
-    kernel = np.array([[0, -1, 0],
-                       [-1, 5, -1],
-                       [0, -1, 0]], dtype=np.float32)
-    sharpened = cv2.filter2D(image, -1, kernel)
+    def __init__(self, image):
+        self.shape = image.shape
+        self.dtype = image.dtype
+        height, width = image.shape[:2]
+        padded_height = cv2.getOptimalDFTSize(height)
+        padded_width = cv2.getOptimalDFTSize(width)
+        padded = cv2.copyMakeBorder(image, 0, padded_height - height, 0, padded_width - width,
+                                    cv2.BORDER_REFLECT)
+        self.padded_shape = (padded_height, padded_width)
+        self.spectrum = np.fft.rfft2(padded.astype(np.float32), axes=(0, 1))
 
-    # Комбинируем: для маски (> T) используем резкое изображение, остальное оставляем оригинальным
-    result = np.copy(image)
-    result[mask > 0] = sharpened[mask > 0]
+    def apply(self, mask):
+        """Умножает спектр на маску и возвращает отфильтрованное изображение."""
+        if self.spectrum.ndim == 3:
+            mask = mask[..., None]
+        filtered = np.fft.irfft2(self.spectrum * mask, s=self.padded_shape, axes=(0, 1))
+        filtered = filtered[:self.shape[0], :self.shape[1]]
+        if np.issubdtype(self.dtype, np.integer):
+            info = np.iinfo(self.dtype)
+            filtered = np.clip(np.rint(filtered), info.min, info.max)
+        return filtered.astype(self.dtype)
 
-    return result
+    def low_pass(self, radius, profile="gaussian"):
+        """Фильтр низких частот с частотой среза radius."""
+        return self.apply(radial_mask(self.padded_shape, "low", radius, profile))
+
+    def high_pass(self, radius, profile="gaussian"):
+        """Фильтр высоких частот с частотой среза radius."""
+        return self.apply(radial_mask(self.padded_shape, "high", radius, profile))
+
+    def band_pass(self, low_radius, high_radius, profile="gaussian"):
+        """Полосовой фильтр: пропускает частоты между low_radius и high_radius."""
+        return self.apply(radial_mask(self.padded_shape, "band", (low_radius, high_radius), profile))
+
+def read_video_frames(path):
+    """Генератор кадров видеофайла (cv2.VideoCapture)."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Не удалось открыть видео: {path}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+def process_stream(frames, filter_name="low", parameter=100, sink=None, workers=None,
+                   buffers=None):
+    """
+    Потоковая фильтрация кадров.
+    - frames: итератор кадров BGR или путь к видеофайлу;
+    - filter_name: "low" (параметр - радиус R) или "high" (параметр - порог T);
+    - sink: функция, получающая готовые кадры по порядку (например, VideoWriter.write);
+      кадр - переиспользуемый буфер, действителен только во время вызова;
+    - workers: число потоков фильтрации (OpenCV отпускает GIL);
+    - buffers: число буферов результата (ограничивает число кадров в обработке).
+    Чтение, фильтрация и запись идут параллельно: чтение - в вызывающем потоке,
+    фильтрация - в пуле потоков, запись - в отдельном потоке с сохранением порядка.
+    Маска круга строится один раз на разрешение, буферы результата переиспользуются.
+    Ошибка фильтрации или sink прерывает обработку и передаётся вызывающему коду.
+    Возвращает число кадров, устойчивую частоту кадров и среднюю задержку этапов (мс).
+    """
+    if isinstance(frames, str):
+        frames = read_video_frames(frames)
+    filters = {"low": apply_low_pass_filter, "high": apply_high_pass_filter}
+    if filter_name not in filters:
+        raise ValueError(f"Неизвестный фильтр: {filter_name}")
+    apply_filter = filters[filter_name]
+    workers = workers or 4
+    buffers = buffers or 2 * workers
+
+    free = queue.Queue()
+    for _ in range(buffers):
+        free.put(None)  # Буферы выделяются по размеру первого кадра
+    latency = {"decode": 0.0, "filter": 0.0, "encode": 0.0}
+    latency_lock = threading.Lock()
+
+    def filter_frame(frame, buffer):
+        start = time.perf_counter()
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame)
+        apply_filter(frame, parameter, out=buffer)
+        with latency_lock:
+            latency["filter"] += time.perf_counter() - start
+        return buffer
+
+    def encode_frame(future, buffer):
+        try:
+            buffer = future.result()
+            start = time.perf_counter()
+            if sink is not None:
+                sink(buffer)
+            latency["encode"] += time.perf_counter() - start
+        finally:
+            free.put(buffer)  # Буфер возвращается и при ошибке фильтрации или записи
+
+    count = 0
+    frames = iter(frames)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=1) as encoder:
+        encoded = []
+        while True:
+            start = time.perf_counter()
+            frame = next(frames, None)
+            latency["decode"] += time.perf_counter() - start
+            if frame is None:
+                break
+            # Ждём освобождения буфера: в обработке не больше buffers кадров.
+            # Ожидание прерывается, если какая-либо запись завершилась ошибкой
+            while True:
+                try:
+                    buffer = free.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    for future in encoded:
+                        if future.done() and future.exception() is not None:
+                            future.result()
+            filtered = pool.submit(filter_frame, frame, buffer)
+            encoded.append(encoder.submit(encode_frame, filtered, buffer))
+            count += 1
+            # Завершённые записи не храним; ошибки поднимаются сразу
+            while encoded and encoded[0].done():
+                encoded.pop(0).result()
+        for future in encoded:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "frames": count,
+        "fps": count / elapsed if elapsed else 0.0,
+        **{f"{stage}_ms": 1000 * total / max(count, 1) for stage, total in latency.items()},
+    }
+
+def print_stream_stats(stats):
+    """Выводит устойчивую частоту кадров и среднюю задержку этапов."""
+    print(f"Кадров: {stats['frames']}, {stats['fps']:.1f} кадр/с")
+    print(f"  Чтение: {stats['decode_ms']:.2f} мс, фильтрация: {stats['filter_ms']:.2f} мс, "
+          f"запись: {stats['encode_ms']:.2f} мс на кадр")
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки; без --video обрабатывается input.jpg."""
+    parser = argparse.ArgumentParser(description="Фильтры низких и высоких частот.")
+    parser.add_argument("--video", help="видеофайл для потоковой обработки")
+    parser.add_argument("--output", help="файл для записи обработанного видео")
+    parser.add_argument("--filter", choices=("low", "high"), default="low", help="тип фильтра")
+    parser.add_argument("--value", type=int, default=100, help="радиус R или порог T")
+    parser.add_argument("--workers", type=int, help="число потоков фильтрации")
+    return parser.parse_args(argv)
+
+def process_video(args):
+    """Потоковая обработка видеофайла с записью результата (если задан --output)."""
+    capture = cv2.VideoCapture(args.video)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    capture.release()
+    writer = None
+    if args.output:
+        writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    try:
+        stats = process_stream(args.video, args.filter, args.value,
+                               sink=writer.write if writer else None, workers=args.workers)
+    finally:
+        if writer is not None:
+            writer.release()
+    print_stream_stats(stats)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.video:
+        process_video(args)
+        return
 
-def main():
     # Загружаем изображение
     image_path = "input.jpg"
     image = cv2.imread(image_path)